@@ -10,17 +10,27 @@ from django.apps import apps
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
+from django.db.models.functions import Lower
 
 from mailinglist.models import Subscription
 
+# Excel and other tools prefix UTF-8 exports with a byte order mark
+DEFAULT_ENCODING = "utf-8-sig"
+
 
 class AddressList:
-    """List with unique addresses."""
+    """List with unique addresses. Addresses are checked against existing
+    subscriptions in chunks of ``chunk_size``, call ``flush`` once all have
+    been added."""
 
-    def __init__(self, mailing_list, ignore_errors=False):
+    def __init__(self, mailing_list, ignore_errors=False, chunk_size=2000):
         self.mailing_list = mailing_list
         self.ignore_errors = ignore_errors
+        self.chunk_size = chunk_size
         self.addresses = {}
+        self.field_limits = FieldLimits()
+        # addresses not yet checked against existing subscriptions
+        self._pending = {}
 
     class OverLongEmailException(Exception):
         pass
@@ -30,7 +40,7 @@ class AddressList:
 
     def _validate_email(self, email):
         try:
-            email = check_field(
+            email = self.field_limits.check(
                 field_name="email", value=email.lower(), ignore_errors=False
             )
         except forms.ValidationError as e:
@@ -54,7 +64,7 @@ class AddressList:
     ):
         """Add name to list."""
 
-        logger.debug(f"Going to add {first_name} {last_name} <{email}>")
+        logger.debug("Going to add %s %s <%s>", first_name, last_name, email)
         try:
             self._validate_email(email)
         except self.OverLongEmailException:
@@ -72,10 +82,10 @@ class AddressList:
                 )
             return
 
-        first_name = check_field(
+        first_name = self.field_limits.check(
             field_name="first_name", value=first_name, ignore_errors=self.ignore_errors
         )
-        last_name = check_field(
+        last_name = self.field_limits.check(
             field_name="last_name", value=last_name, ignore_errors=self.ignore_errors
         )
 
@@ -91,68 +101,131 @@ class AddressList:
                 )
             return
 
-        if subscription_exists(self.mailing_list, email):
-            logger.warning(f"Entry '{email}' is already subscribed to at {location}.")
-
-            if not self.ignore_errors:
-                raise forms.ValidationError("Some entries are already subscribed to.")
-            return
-
         self.addresses[email] = {
             "first_name": first_name,
             "last_name": last_name,
             "email": email,
         }
+        self._pending[email] = location
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Remove addresses added since the last flush which are already
+        subscribed to the mailing list, found with a single query."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        subscribed = set(
+            Subscription.objects.filter(mailing_list=self.mailing_list)
+            .annotate(email_key=Lower("user__email"))
+            .filter(email_key__in={email.lower() for email in pending})
+            .values_list("email_key", flat=True)
+        )
+        for email, location in pending.items():
+            if email.lower() not in subscribed:
+                continue
+            logger.warning(f"Entry '{email}' is already subscribed to at {location}.")
+
+            if not self.ignore_errors:
+                raise forms.ValidationError("Some entries are already subscribed to.")
+            del self.addresses[email]
 
 
-def subscription_exists(mailing_list, email):
+class FieldLimits:
     """
-    Return wheter or not a subscription exists.
+    Checks the length of values for fields of the user model, the maximum
+    length of each field is looked up once.
     """
-    qs = Subscription.objects.filter(
-        mailing_list__id=mailing_list.id, user__email__iexact=email
-    )
 
-    return qs.exists()
+    def __init__(self):
+        self.user_model = apps.get_model(settings.MAILINGLIST_USER_MODEL)
+        self.max_lengths = {}
+
+    def get_max_length(self, field_name):
+        try:
+            return self.max_lengths[field_name]
+        except KeyError:
+            max_length = self.user_model._meta.get_field(field_name).max_length
+            self.max_lengths[field_name] = max_length
+            return max_length
+
+    def check(self, *, field_name, value, ignore_errors=False):
+        """
+        Check (length of) value address.
+        """
+        if value is None:
+            return None
+
+        max_length = self.get_max_length(field_name)
+
+        # Get rid of leading/trailing spaces
+        value = value.strip()
+
+        if len(value) <= max_length or ignore_errors:
+            return value[:max_length]
+        else:
+            raise forms.ValidationError(
+                f"{field_name} value '{value}' too long, maximum length is "
+                f"{max_length} characters."
+            )
 
 
 def check_field(*, field_name, value, ignore_errors=False):
     """
     Check (length of) value address.
     """
-
-    logger.debug(f"Checking {field_name} '{value}'")
-    if value is None:
-        return None
-
-    max_length = (
-        apps.get_model(settings.MAILINGLIST_USER_MODEL)
-        ._meta.get_field(field_name)
-        .max_length
+    return FieldLimits().check(
+        field_name=field_name, value=value, ignore_errors=ignore_errors
     )
 
-    # Get rid of leading/trailing spaces
-    value = value.strip()
-
-    if len(value) <= max_length or ignore_errors:
-        return value[:max_length]
-    else:
-        raise forms.ValidationError(
-            f"{field_name} value '{value}' too long, maximum length is "
-            f"{max_length} characters."
-        )
-
 
-def parse_csv(csv_file, mailing_list, ignore_errors=False):
+def parse_csv(
+    csv_file,
+    mailing_list,
+    ignore_errors=False,
+    *,
+    encoding=DEFAULT_ENCODING,
+    progress=None,
+    progress_interval=1000,
+):
     """
     Parse addresses from CSV file-object into mailing list.
 
+    The (binary) file is decoded as it is read, so it is never held in memory
+    as a whole. The default encoding skips a UTF-8 byte order mark, if any.
+    ``progress`` (if given) is called with the number of rows and of bytes read
+    so far every ``progress_interval`` rows and once the file has been read.
+
     Returns a dictionary mapping email addresses into Subscription objects.
     """
+
+    def report(rows):
+        bytes_read = csv_file.tell()
+        logger.info("Read %d rows (%d bytes) of address file", rows, bytes_read)
+        if progress is not None:
+            progress(rows=rows, bytes_read=bytes_read)
+
     address_list = AddressList(mailing_list, ignore_errors)
-    _csv_file = io.StringIO(csv_file.read().decode())
-    reader = DictReader(_csv_file)
-    for idx, row in enumerate(reader):
-        address_list.add(**row, location=f"line {idx}")
+    # newline="" leaves line endings within quoted fields to the csv module
+    _csv_file = io.TextIOWrapper(csv_file, encoding=encoding, newline="")
+    idx = -1
+    try:
+        reader = DictReader(_csv_file)
+        for idx, row in enumerate(reader):
+            address_list.add(**row, location=f"line {idx}")
+            if (idx + 1) % progress_interval == 0:
+                report(idx + 1)
+    except UnicodeDecodeError:
+        raise forms.ValidationError(
+            f"The address file could not be read as '{encoding}' after "
+            f"line {idx}, please choose its encoding."
+        )
+    finally:
+        # leave the uploaded file open
+        _csv_file.detach()
+    address_list.flush()
+    if (idx + 1) % progress_interval or idx < 0:
+        report(idx + 1)
 
     return address_list.addresses
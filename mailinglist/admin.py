@@ -81,13 +81,18 @@ class SendingInline(ImmutableTabluarInline):
     readonly_fields = ["submission", "sent"]
 
 
+class SendingFailureInline(ImmutableTabluarInline):
+    model = models.SendingFailure
+    readonly_fields = ["submission", "status", "attempts", "next_attempt", "last_error"]
+
+
 @admin.register(models.Subscription)
 class SubscriptionAdmin(ExtendibleModelAdminMixin, admin.ModelAdmin):
     model = models.Subscription
     readonly_fields = ("token", "status")
     list_display = ("pk", "user", "mailing_list", "status")
     list_filter = ("mailing_list", "status")
-    inlines = (SubscriptionChangeInline, SendingInline)
+    inlines = (SubscriptionChangeInline, SendingInline, SendingFailureInline)
     actions = ("make_subscribed", "make_unsubscribed")
 
     def save_model(self, request, obj, form, change):
@@ -166,10 +171,9 @@ class SubscriptionAdmin(ExtendibleModelAdminMixin, admin.ModelAdmin):
             form = ConfirmForm(request.POST)
             if form.is_valid():
                 try:
-                    service = SubscriptionService()
-                    for _user in addresses.values():
-                        user = service.create_user(**_user)
-                        service.force_subscribe(user=user, mailing_list=mailing_list)
+                    SubscriptionService().import_subscribers(
+                        addresses=addresses.values(), mailing_list=mailing_list
+                    )
                 finally:
                     del request.session["addresses"]
                     del request.session["mailing_list_pk"]
@@ -314,7 +318,7 @@ class SubmissionAdmin(ExtendibleModelAdminMixin, admin.ModelAdmin):
     form = SubmissionModelForm
     model = models.Submission
     list_display = ("__str__", "status", "published")
-    readonly_fields = ("published", "status")
+    readonly_fields = ("published", "status", "snapshot_taken")
     exclude = ("sendings",)
     actions = ("publish",)
 
@@ -1,7 +1,7 @@
 from django import forms
 from django.db.models import Q
 
-from mailinglist.addressimport.parsers import parse_csv
+from mailinglist.addressimport.parsers import DEFAULT_ENCODING, parse_csv
 from mailinglist.models import MailingList, Message, Submission
 
 
@@ -40,6 +40,7 @@ class ImportForm(forms.Form):
             address_file.file,
             self.cleaned_data["mailing_list"],
             self.cleaned_data["ignore_errors"],
+            encoding=self.cleaned_data.get("encoding") or DEFAULT_ENCODING,
         )
 
         if len(self.addresses) == 0:
@@ -55,6 +56,17 @@ class ImportForm(forms.Form):
         queryset=MailingList.objects.all(),
     )
     address_file = forms.FileField(label="Address file")
+    encoding = forms.ChoiceField(
+        label="Encoding",
+        choices=(
+            (DEFAULT_ENCODING, "UTF-8"),
+            ("utf-16", "UTF-16"),
+            ("cp1252", "Windows (Western European)"),
+            ("latin-1", "ISO-8859-1"),
+        ),
+        initial=DEFAULT_ENCODING,
+        required=False,
+    )
     ignore_errors = forms.BooleanField(
         label="Ignore non-fatal errors", initial=True, required=False
     )
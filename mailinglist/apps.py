@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MailinglistConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "mailinglist"
+
+    def ready(self):
+        from mailinglist import signals  # noqa: F401
@@ -13,13 +13,29 @@ class MailinglistAppConf(AppConf):
     USER_MODEL = settings.AUTH_USER_MODEL
     HOOKSET = "mailinglist.hooks.MailinglistDefaultHookset"
     CONFIRM_EMAIL_SUBSCRIBE = True
+    QUEUE_CONFIRMATIONS = False
+    QUEUE_SUBMISSIONS = False
+    MAX_ATTEMPTS = 5
+    RETRY_DELAY = 60  # seconds
+    CLAIM_TIMEOUT = 600  # seconds
     EMAIL_DELAY = 0.1
-    BATCH_DELAY = 10  # seconds
+    SEND_RATE = None  # messages per second
+    SEND_BURST = None  # messages
+    BATCH_DELAY = None  # seconds
     BATCH_SIZE = 100
+    SEND_WORKERS = 1
+    SHARED_RATE_LIMIT = False
+    SEND_FIELDS = ()
+    ATTACHMENT_CACHE_SIZE = 10 * 1024 * 1024  # bytes
 
     def configure_hookset(self, value):
         return import_attribute(value)()
 
+    def configure_send_workers(self, value):
+        if value < 1:
+            raise ImproperlyConfigured("MAILINGLIST_SEND_WORKERS must be at least 1")
+        return value
+
     def configure_default_sender_email(self, value):
         if value is None:
             raise ImproperlyConfigured(
@@ -22,3 +22,14 @@ class SubmissionStatusEnum(Enum):
         SENDING: (PENDING,),
         PENDING: (NEW,),
     }
+
+
+class SendingFailureStatusEnum(Enum):
+    RETRYING = 0
+    DEAD = 1
+
+    __default__ = RETRYING
+
+    __transitions__ = {
+        DEAD: (RETRYING,),
+    }
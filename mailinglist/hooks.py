@@ -1,9 +1,13 @@
+import inspect
 import os
+from contextlib import contextmanager
+from functools import cached_property
+from smtplib import SMTPException, SMTPServerDisconnected
 
 from django.apps import apps
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
 
 
 class MailinglistDefaultHookset:
@@ -20,6 +24,41 @@ class MailinglistDefaultHookset:
             )
         return user
 
+    def bulk_create_users(self, users):
+        """Creates (or finds) a user for each of ``users``, given as the
+        keyword arguments for ``create_user``, and returns them in the same
+        order. If ``create_user`` is overridden then it is called for each user
+        instead; override this as well to create your users in bulk."""
+        if type(self).create_user is not MailinglistDefaultHookset.create_user:
+            return [self.create_user(**user) for user in users]
+        user_model = apps.get_model(settings.MAILINGLIST_USER_MODEL)
+        emails = {user["email"] for user in users}
+        found = {
+            user.email: user for user in user_model.objects.filter(email__in=emails)
+        }
+        new_users = {
+            user["email"]: user_model(username=f"user{hash(user['email'])}", **user)
+            for user in users
+            if user["email"] not in found
+        }
+        created = user_model.objects.bulk_create(new_users.values())
+        if not all(user.pk for user in created):
+            # backends which don't return primary keys from bulk inserts
+            created = user_model.objects.filter(email__in=new_users)
+        found.update((user.email, user) for user in created)
+        return [found[user["email"]] for user in users]
+
+    @contextmanager
+    def connection(self):
+        """Provides an email backend connection which is held open while
+        sending many messages with ``send_message``."""
+        connection = get_connection()
+        connection.open()
+        try:
+            yield connection
+        finally:
+            connection.close()
+
     def send_message(
         self,
         *,
@@ -30,6 +69,7 @@ class MailinglistDefaultHookset:
         html_body=None,
         attachments=None,
         headers=None,
+        connection=None,
     ):
         message = EmailMultiAlternatives(
             to=to,
@@ -37,15 +77,59 @@ class MailinglistDefaultHookset:
             subject=subject,
             from_email=from_email,
             headers=headers,
+            connection=connection,
         )
         _attachments = attachments or []
 
         for attachment in _attachments:
-            message.attach_file(attachment.file.path)
+            message.attach(attachment.filename, attachment.content, attachment.mimetype)
 
         if html_body is not None:
             message.attach_alternative(html_body, "text/html")
-        message.send()
+        try:
+            message.send()
+        except (SMTPServerDisconnected, ConnectionError):
+            if connection is None:
+                raise
+            # the server dropped the shared connection, reconnect and retry once
+            connection.close()
+            connection.open()
+            message.send()
+
+    @cached_property
+    def _send_message_accepts_connection(self):
+        # overrides of ``send_message`` written before it took a connection
+        parameters = inspect.signature(self.send_message).parameters.values()
+        return any(
+            parameter.name == "connection"
+            or parameter.kind == inspect.Parameter.VAR_KEYWORD
+            for parameter in parameters
+        )
+
+    def send_messages(self, messages, *, connection=None):
+        """Sends a batch of messages, each given as the keyword arguments for
+        ``send_message``, over a single connection. Returns a list holding
+        (in order) ``None`` for each message which was sent or the delivery
+        error (``SMTPException`` or ``OSError``) raised while sending it, any
+        other error is raised. Override this to deliver batches through a
+        bulk sending API. The connection is passed on to ``send_message``
+        only if it accepts a ``connection`` argument."""
+        if connection is None:
+            with self.connection() as connection:
+                return self.send_messages(messages, connection=connection)
+        if not self._send_message_accepts_connection:
+            connection_kwargs = {}
+        else:
+            connection_kwargs = {"connection": connection}
+        results = []
+        for message_kwargs in messages:
+            try:
+                self.send_message(**connection_kwargs, **message_kwargs)
+            except (SMTPException, OSError) as e:
+                results.append(e)
+            else:
+                results.append(None)
+        return results
 
     def message_attachment_file_validator(self, value):
         valid_file_extensions = [".pdf", ".jpg", ".jpeg", ".png", ".tiff", ".tif"]
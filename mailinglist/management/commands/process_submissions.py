@@ -1,10 +1,15 @@
 from django.core.management.base import BaseCommand
 
-from mailinglist.services import SubmissionService
+from mailinglist.conf import settings
+from mailinglist.services import OutboxService, SubmissionService
 
 
 class Command(BaseCommand):
-    help = "Send published submissions."
+    help = "Send published submissions and queued email."
 
     def handle(self, *args, **options):
+        OutboxService().process_outbox()
         SubmissionService().process_submissions()
+        if settings.MAILINGLIST_QUEUE_SUBMISSIONS:
+            # send what was just queued
+            OutboxService().process_outbox()
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:16
+
+from django.db import migrations, models
+from markdown import markdown
+
+
+def render_html(apps, schema_editor):
+    MessagePart = apps.get_model("mailinglist", "MessagePart")
+    parts = MessagePart.objects.only("text").iterator()
+    updated = []
+    for part in parts:
+        part.html = markdown(part.text)
+        updated.append(part)
+        if len(updated) >= 100:
+            MessagePart.objects.bulk_update(updated, ["html"])
+            updated = []
+    MessagePart.objects.bulk_update(updated, ["html"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("mailinglist", "0004_ratelimitbucket"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="messagepart",
+            name="html",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(render_html, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("mailinglist", "0006_outboxmessage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboxmessage",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="outboxmessage",
+            name="last_error",
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="outboxmessage",
+            name="next_attempt",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                default=django.utils.timezone.now,
+                help_text="Empty once the email will no longer be retried.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="outboxmessage",
+            name="submission",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="mailinglist.submission",
+            ),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_enumfield.db.fields
+import mailinglist.enum
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("mailinglist", "0007_outboxmessage_retries"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SendingFailure",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    django_enumfield.db.fields.EnumField(
+                        default=0, enum=mailinglist.enum.SendingFailureStatusEnum
+                    ),
+                ),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("next_attempt", models.DateTimeField(blank=True, null=True)),
+                ("last_error", models.TextField(blank=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                (
+                    "submission",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="mailinglist.submission",
+                    ),
+                ),
+                (
+                    "subscription",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="mailinglist.subscription",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="sendingfailure",
+            constraint=models.UniqueConstraint(
+                fields=("submission", "subscription"),
+                name="unique_failure_per_subscription",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("mailinglist", "0008_sendingfailure"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="submission",
+            name="cursor",
+            field=models.PositiveBigIntegerField(
+                default=0,
+                editable=False,
+                help_text="Subscriptions up to this primary key have been processed.",
+            ),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:23
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicates(apps, schema_editor):
+    Sending = apps.get_model("mailinglist", "Sending")
+    duplicates = (
+        Sending.objects.values("submission", "subscription")
+        .annotate(count=Count("pk"), first=Min("pk"))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for duplicate in duplicates.iterator():
+        Sending.objects.filter(
+            submission=duplicate["submission"],
+            subscription=duplicate["subscription"],
+        ).exclude(pk=duplicate["first"]).delete()
+
+
+class AddUniqueConstraint(migrations.AddConstraint):
+    """Builds the index for the constraint without locking the table against
+    writes on PostgreSQL, then attaches the constraint to it."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = to_state.apps.get_model(app_label, self.model_name)
+        table = schema_editor.quote_name(model._meta.db_table)
+        name = schema_editor.quote_name(self.constraint.name)
+        columns = ", ".join(
+            schema_editor.quote_name(model._meta.get_field(field).column)
+            for field in self.constraint.fields
+        )
+        schema_editor.execute(
+            f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+            f"ON {table} ({columns})"
+        )
+        schema_editor.execute(
+            f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}"
+        )
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("mailinglist", "0009_submission_cursor"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop, atomic=True),
+        AddUniqueConstraint(
+            model_name="sending",
+            constraint=models.UniqueConstraint(
+                fields=("submission", "subscription"),
+                name="unique_sending_per_subscription",
+            ),
+        ),
+    ]
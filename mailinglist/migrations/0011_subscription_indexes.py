@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:25
+
+from django.db import migrations, models
+import mailinglist.enum
+
+
+class AddIndex(migrations.AddIndex):
+    """Builds the index without locking the table against writes on
+    PostgreSQL."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("mailinglist", "0010_sending_unique"),
+    ]
+
+    operations = [
+        AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                fields=["mailing_list", "status"], name="subscription_list_status"
+            ),
+        ),
+        AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                condition=models.Q(
+                    ("status", mailinglist.enum.SubscriptionStatusEnum(1))
+                ),
+                fields=["mailing_list", "id"],
+                name="subscription_subscribed",
+            ),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("mailinglist", "0011_subscription_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="submission",
+            name="snapshot_taken",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                help_text="When the recipients of the submission were recorded.",
+                null=True,
+            ),
+        ),
+        migrations.CreateModel(
+            name="Recipient",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "submission",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="recipients",
+                        to="mailinglist.submission",
+                    ),
+                ),
+                (
+                    "subscription",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="mailinglist.subscription",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="recipient",
+            constraint=models.UniqueConstraint(
+                fields=("submission", "subscription"),
+                name="unique_recipient_per_subscription",
+            ),
+        ),
+    ]
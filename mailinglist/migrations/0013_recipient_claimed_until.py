@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("mailinglist", "0012_recipient"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipient",
+            name="claimed_until",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="The subscription is being sent to by a process until then.",
+                null=True,
+            ),
+        ),
+    ]
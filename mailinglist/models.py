@@ -6,7 +6,11 @@ from django_enumfield.enum import EnumField
 from markdown import markdown
 
 from mailinglist.conf import hookset, settings
-from mailinglist.enum import SubmissionStatusEnum, SubscriptionStatusEnum
+from mailinglist.enum import (
+    SendingFailureStatusEnum,
+    SubmissionStatusEnum,
+    SubscriptionStatusEnum,
+)
 
 
 class MailingList(models.Model):
@@ -80,6 +84,18 @@ class Subscription(models.Model):
                 fields=["user", "mailing_list"], name="unique_user_per_mailing_list"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["mailing_list", "status"], name="subscription_list_status"
+            ),
+            # walking the subscribers of a list (by pk) when sending, partial
+            #  indexes are skipped on databases which do not support them
+            models.Index(
+                fields=["mailing_list", "id"],
+                condition=models.Q(status=SubscriptionStatusEnum.SUBSCRIBED),
+                name="subscription_subscribed",
+            ),
+        ]
 
 
 class SubscriptionChange(models.Model):
@@ -125,12 +141,41 @@ class MessagePart(models.Model):
     heading = models.CharField(max_length=128)
     order = models.PositiveSmallIntegerField()
     text = models.TextField()
+    # rendered from ``text`` upon save
+    html = models.TextField(blank=True, editable=False)
     # TODO: images!
 
+    # the text ``html`` was rendered from
+    _html_source = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the stored html is trusted to match the text it was loaded with
+        instance._html_source = instance.__dict__.get("text")
+        return instance
+
     @property
     def html_text(self):
+        # deferred text can't have been changed since it was loaded
+        if self.html and (
+            "text" in self.get_deferred_fields() or self.text == self._html_source
+        ):
+            return self.html
         return markdown(self.text)
 
+    def save(self, *args, update_fields=None, **kwargs):
+        if (
+            (update_fields is None or "text" in update_fields)
+            and "text" not in self.get_deferred_fields()
+            and self.text != self._html_source
+        ):
+            self.html = markdown(self.text)
+            self._html_source = self.text
+            if update_fields is not None:
+                update_fields = {*update_fields, "html"}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
     class Meta:
         ordering = ["order"]
         constraints = [
@@ -199,11 +244,49 @@ class Submission(models.Model):
     sendings = models.ManyToManyField(
         Subscription, through="Sending", related_name="sendings"
     )
+    cursor = models.PositiveBigIntegerField(
+        default=0,
+        editable=False,
+        help_text="Subscriptions up to this primary key have been processed.",
+    )
+    snapshot_taken = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="When the recipients of the submission were recorded.",
+    )
 
     def __str__(self):
         return f"{self.message} to {self.message.mailing_list}"
 
 
+class Recipient(models.Model):
+    """Snapshot of the subscriptions a ``Submission`` is sent to, recorded when
+    it is published. Subscribers who join the mailing list after that are not
+    sent the submission. A process sending the submission claims recipients
+    for ``MAILINGLIST_CLAIM_TIMEOUT`` seconds while it sends to them."""
+
+    submission = models.ForeignKey(
+        Submission, on_delete=models.CASCADE, related_name="recipients"
+    )
+    subscription = models.ForeignKey(
+        Subscription, on_delete=models.CASCADE, related_name="+"
+    )
+    claimed_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="The subscription is being sent to by a process until then.",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["submission", "subscription"],
+                name="unique_recipient_per_subscription",
+            )
+        ]
+
+
 class Sending(models.Model):
     """Tracks the sending of each ``Submission`` to each individual
     ``Subscription``. Provided for audit, as well as to allow interruped
@@ -212,3 +295,76 @@ class Sending(models.Model):
     submission = models.ForeignKey(Submission, on_delete=models.PROTECT)
     subscription = models.ForeignKey(Subscription, on_delete=models.PROTECT)
     sent = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["submission", "subscription"],
+                name="unique_sending_per_subscription",
+            )
+        ]
+
+
+class SendingFailure(models.Model):
+    """Tracks a ``Submission`` which could not be sent to a ``Subscription``.
+    The subscription is retried (after ``next_attempt``) until it has failed
+    ``MAILINGLIST_MAX_ATTEMPTS`` times, after which it is given up on."""
+
+    submission = models.ForeignKey(Submission, on_delete=models.PROTECT)
+    subscription = models.ForeignKey(Subscription, on_delete=models.PROTECT)
+    status = EnumField(SendingFailureStatusEnum)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["submission", "subscription"],
+                name="unique_failure_per_subscription",
+            )
+        ]
+
+
+class RateLimitBucket(models.Model):
+    """Token bucket shared by every process sending email, used when
+    ``MAILINGLIST_SHARED_RATE_LIMIT`` is enabled. The row is locked while
+    tokens are taken so that concurrent workers observe a single budget."""
+
+    name = models.SlugField(max_length=50, unique=True)
+    tokens = models.FloatField()
+    updated = models.DateTimeField()
+
+    def __str__(self):
+        return self.name
+
+
+class OutboxMessage(models.Model):
+    """An email waiting to be sent by ``OutboxService``. Holds the keyword
+    arguments for ``hookset.send_message`` (attachments are taken from the
+    submission, if any), the record is removed once the email has been
+    sent. Email of a submission keeps its subscription, which is recorded as
+    failed should the email be given up on."""
+
+    payload = models.JSONField()
+    submission = models.ForeignKey(
+        Submission, on_delete=models.PROTECT, null=True, blank=True
+    )
+    subscription = models.ForeignKey(
+        Subscription,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt = models.DateTimeField(
+        default=now,
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="Empty once the email will no longer be retried.",
+    )
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True, editable=False)
@@ -1,15 +1,50 @@
+import logging
+import mimetypes
+import os
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import timedelta
 from random import randint
+from smtplib import SMTPException
 
 from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import Greatest
 from django.template.loader import select_template
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.crypto import get_random_string
+from django.utils.functional import cached_property
 from django.utils.timezone import now
 
 from mailinglist import models
 from mailinglist.conf import hookset
-from mailinglist.enum import SubmissionStatusEnum, SubscriptionStatusEnum
+from mailinglist.enum import (
+    SendingFailureStatusEnum,
+    SubmissionStatusEnum,
+    SubscriptionStatusEnum,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# resolved templates, keyed by (mailing list slug, action, suffix)
+_template_cache = {}
+
+
+def clear_template_cache(*, slugs=None):
+    """Forgets the resolved templates of the mailing lists with the given
+    slugs (``None`` for the global-deny templates), or all of them."""
+    if slugs is None:
+        _template_cache.clear()
+        return
+    for key in list(_template_cache):
+        if key[0] in slugs:
+            _template_cache.pop(key, None)
 
 
 class TemplateSet:
@@ -47,12 +82,15 @@ class TemplateSet:
         slug = "global-deny"
         if self.mailing_list is not None:
             slug = self.mailing_list.slug
-        return select_template(
-            [
-                f"{_root}/{slug}/{_for}.{suffix}",
-                f"{_root}/{_for}.{suffix}",
-            ]
-        )
+        key = (None if self.mailing_list is None else slug, _for, suffix)
+        if key not in _template_cache:
+            _template_cache[key] = select_template(
+                [
+                    f"{_root}/{slug}/{_for}.{suffix}",
+                    f"{_root}/{_for}.{suffix}",
+                ]
+            )
+        return _template_cache[key]
 
     def render_to_dict(self, context: dict):  # -> dict[str, str]:
         """Renders each template in the set and arranges the text into a
@@ -67,9 +105,88 @@ class TemplateSet:
         return rendered
 
 
+PLACEHOLDER_TOKEN = "mailinglistplaceholdertoken"
+# shares no character (at any position) or length with ``PLACEHOLDER_TOKEN``
+CHECK_PLACEHOLDER_TOKEN = "0123456789" * 3 + "0"
+
+
+class SubscriptionPlaceholder:
+    """Stands in for the subscription while a message is rendered once for
+    a whole submission. Templates may use the ``token``, using any other
+    subscription data marks the render as personalized."""
+
+    def __init__(self, token=PLACEHOLDER_TOKEN):
+        self.token = token
+        self.personalized = False
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        self.personalized = True
+        return ""
+
+    def __str__(self):
+        self.personalized = True
+        return ""
+
+
+class SubmissionTemplateSet(TemplateSet):
+    """Represents the templates for sending a single message to many
+    subscriptions. The message is rendered once, rendering for each
+    subscription only fills in the subscription token. Templates which use
+    any other subscription data are rendered in full for each subscription."""
+
+    def __init__(self, *, message: models.Message, action: str = "message"):
+        super().__init__(mailing_list=message.mailing_list, action=action)
+        self.message = message
+        self._prerendered = None
+        self._personalized = False
+
+    def _render_placeholder(self, token):
+        placeholder = SubscriptionPlaceholder(token)
+        rendered = super().render_to_dict(
+            {"subscription": placeholder, "message": self.message}
+        )
+        return rendered, placeholder.personalized
+
+    def _prerender(self):
+        if self._prerendered is not None or self._personalized:
+            return self._prerendered
+        rendered, personalized = self._render_placeholder(PLACEHOLDER_TOKEN)
+        if not personalized:
+            # filters applied to the token (``|upper``, ``|length``...) change
+            # it beyond recognition, so render with a second placeholder and
+            # make sure filling in the token accounts for every difference
+            check, personalized = self._render_placeholder(CHECK_PLACEHOLDER_TOKEN)
+            personalized = personalized or check != {
+                attr: text.replace(PLACEHOLDER_TOKEN, CHECK_PLACEHOLDER_TOKEN)
+                for attr, text in rendered.items()
+            }
+        if personalized:
+            self._personalized = True
+        else:
+            self._prerendered = rendered
+        return self._prerendered
+
+    def render_to_dict(self, context: dict):  # -> dict[str, str]:
+        subscription = context.get("subscription")
+        if subscription is None or context.get("message") is not self.message:
+            return super().render_to_dict(context)
+        prerendered = self._prerender()
+        if prerendered is None:
+            return super().render_to_dict(context)
+        return {
+            attr: text.replace(PLACEHOLDER_TOKEN, subscription.token)
+            for attr, text in prerendered.items()
+        }
+
+
 class MessageService:
     """Composes email for sending"""
 
+    def __init__(self):
+        self._header_templates = {}
+
     def _urlify(self, path):
         return f"<{settings.MAILINGLIST_BASE_URL}{path}>"
 
@@ -85,39 +202,58 @@ class MessageService:
         buffer += f"<mailto: {mailing_list.email}?subject={subject}>"
         return buffer
 
-    def _headers(self, *, subscription):
+    def _header_template(self, mailing_list):
         """Provides necessary headers with correct formatting for good
-        adherence to RFC2369.
+        adherence to RFC2369 (and one-click unsubscribe per RFC8058). The
+        subscription token is left as a placeholder; headers are built once
+        per mailing list and split into those with and without the token.
 
         Reference
         ^^^^^^^^^
         https://datatracker.ietf.org/doc/html/rfc2369
+        https://datatracker.ietf.org/doc/html/rfc8058
         """
-        _list = subscription.mailing_list
-        _help_path = reverse(
-            "mailinglist:subscriptions", kwargs={"token": subscription.token}
-        )
-        _unsubscribe_path = reverse(
-            "mailinglist:unsubscribe", kwargs={"token": subscription.token}
-        )
-        _subscribe_path = reverse(
-            "mailinglist:subscribe_confirm", kwargs={"token": subscription.token}
-        )
-        if subscription.mailing_list is None:
+        key = None if mailing_list is None else (mailing_list.slug, mailing_list.email)
+        if key in self._header_templates:
+            return self._header_templates[key]
+        _token = {"token": PLACEHOLDER_TOKEN}
+        _help_path = reverse("mailinglist:subscriptions", kwargs=_token)
+        _unsubscribe_path = reverse("mailinglist:unsubscribe", kwargs=_token)
+        _subscribe_path = reverse("mailinglist:subscribe_confirm", kwargs=_token)
+        if mailing_list is None:
             _archive_path = reverse("mailinglist:archives")
         else:
             _archive_path = reverse(
-                "mailinglist:archive_index", kwargs={"mailing_list_slug": _list.slug}
+                "mailinglist:archive_index",
+                kwargs={"mailing_list_slug": mailing_list.slug},
             )
-        return {
-            "List-Help": self._urlify(_help_path) + self._mailto(_list, subject="help"),
+        headers = {
+            "List-Help": self._urlify(_help_path)
+            + self._mailto(mailing_list, subject="help"),
             "List-Unsubscribe": self._urlify(_unsubscribe_path)
-            + self._mailto(_list, subject="unsubscribe"),
+            + self._mailto(mailing_list, subject="unsubscribe"),
+            "List-Unsubscribe-Post": "List-Unsubscribe=One-Click",
             "List-Subscribe": self._urlify(_subscribe_path),
             "List-Post": "NO",
-            "List-Owner": self._mailto(_list, appended=False),
+            "List-Owner": self._mailto(mailing_list, appended=False),
             "List-Archive": self._urlify(_archive_path),
         }
+        template = (
+            {k: v for k, v in headers.items() if PLACEHOLDER_TOKEN not in v},
+            {k: v for k, v in headers.items() if PLACEHOLDER_TOKEN in v},
+        )
+        self._header_templates[key] = template
+        return template
+
+    def _headers(self, *, subscription):
+        static, tokenized = self._header_template(subscription.mailing_list)
+        return {
+            **static,
+            **{
+                k: v.replace(PLACEHOLDER_TOKEN, subscription.token)
+                for k, v in tokenized.items()
+            },
+        }
 
     def _prepare_kwargs(
         self,
@@ -177,6 +313,9 @@ class MessageService:
 class SubscriptionService:
     """Manages all subscription and unsubscribe events."""
 
+    # addresses created and subscribed per set of queries when importing
+    import_chunk_size = 1000
+
     def _random_string(self, length):
         return get_random_string(
             length=length, allowed_chars="abcdefghijklmnopqrstuvwxyz0123456789-"
@@ -229,8 +368,8 @@ class SubscriptionService:
         )
         if subscription.mailing_list is not None:
             sender = subscription.mailing_list.sender_tag
-        hookset.send_message(
-            from_email=sender,
+        message_kwargs = {
+            "from_email": sender,
             **MessageService().prepare_confirmation_kwargs(
                 subscription=subscription,
                 template_set=TemplateSet(
@@ -238,7 +377,11 @@ class SubscriptionService:
                     action="subscribe",
                 ),
             ),
-        )
+        }
+        if settings.MAILINGLIST_QUEUE_CONFIRMATIONS:
+            OutboxService().enqueue(**message_kwargs)
+        else:
+            hookset.send_message(**message_kwargs)
 
     # Type hints get bothersome for this dynamic user model...
     def create_user(self, *, email: str, first_name: str, last_name: str):
@@ -249,6 +392,12 @@ class SubscriptionService:
         )
         return user
 
+    def bulk_create_users(self, users):
+        """Creates "users" for many new subscriptions at once, given as the
+        keyword arguments for ``create_user``. This method calls the same-named
+        method in the hookset to actually perform the action."""
+        return hookset.bulk_create_users(users)
+
     def _subscribe(self, *, user, mailing_list):
         try:
             subscription = models.Subscription.objects.get(
@@ -266,6 +415,78 @@ class SubscriptionService:
         self._confirm_subscription(subscription)
         return subscription
 
+    def bulk_force_subscribe(
+        self, *, users, mailing_list: models.MailingList
+    ):  # -> list[models.Subscription]:
+        """Creates active subscriptions for many users at once, skipping any
+        confirmation email. The same ``SubscriptionChange`` records are kept
+        as with ``force_subscribe``."""
+        users = list({user.pk: user for user in users}.values())
+        subscriptions = {
+            subscription.user_id: subscription
+            for subscription in models.Subscription.objects.filter(
+                user__in=users, mailing_list=mailing_list
+            )
+        }
+        new_subscriptions = models.Subscription.objects.bulk_create(
+            models.Subscription(
+                user=user,
+                mailing_list=mailing_list,
+                token=self._generate_token(user=user, mailing_list=mailing_list),
+            )
+            for user in users
+            if user.pk not in subscriptions
+        )
+        if not all(subscription.pk for subscription in new_subscriptions):
+            # backends which don't return primary keys from bulk inserts
+            new_subscriptions = models.Subscription.objects.filter(
+                user__in=[subscription.user for subscription in new_subscriptions],
+                mailing_list=mailing_list,
+            )
+        subscriptions.update(
+            (subscription.user_id, subscription) for subscription in new_subscriptions
+        )
+        if mailing_list is None:
+            models.GlobalDeny.objects.bulk_create(
+                (models.GlobalDeny(user=user) for user in users),
+                ignore_conflicts=True,
+            )
+        subscriptions = [subscriptions[user.pk] for user in users]
+        changed = [
+            subscription
+            for subscription in subscriptions
+            if subscription.status != SubscriptionStatusEnum.SUBSCRIBED
+        ]
+        models.SubscriptionChange.objects.bulk_create(
+            models.SubscriptionChange(
+                subscription=subscription,
+                from_status=subscription.status,
+                to_status=SubscriptionStatusEnum.SUBSCRIBED,
+            )
+            for subscription in changed
+        )
+        models.Subscription.objects.filter(
+            pk__in=[subscription.pk for subscription in changed]
+        ).update(status=SubscriptionStatusEnum.SUBSCRIBED)
+        for subscription in changed:
+            subscription.status = SubscriptionStatusEnum.SUBSCRIBED
+        return subscriptions
+
+    def import_subscribers(
+        self, *, addresses, mailing_list: models.MailingList
+    ):  # -> int:
+        """Creates users for the given addresses (the keyword arguments for
+        ``create_user``) and subscribes them, skipping any confirmation email.
+        Addresses are handled in chunks of ``import_chunk_size``, all in one
+        transaction. Returns the number of addresses imported."""
+        addresses = list(addresses)
+        with transaction.atomic():
+            for start in range(0, len(addresses), self.import_chunk_size):
+                end = start + self.import_chunk_size
+                users = self.bulk_create_users(addresses[start:end])
+                self.bulk_force_subscribe(users=users, mailing_list=mailing_list)
+        return len(addresses)
+
     def subscribe(
         self, *, user, mailing_list: models.MailingList, force_confirm=False
     ):  # -> models.Subscription:
@@ -310,81 +531,722 @@ class SubscriptionService:
         return self._confirm_unsubscription(subscription)
 
 
+class AttachmentPayload:
+    """The content of a ``MessageAttachment`` ready to be attached to
+    outgoing email. The file is read from storage once and held in memory,
+    unless ``cache`` is ``False`` in which case it is read anew each time
+    ``content`` is accessed. The stored ``file`` of the attachment remains
+    available as well."""
+
+    def __init__(self, attachment: models.MessageAttachment, *, cache: bool = True):
+        self.attachment = attachment
+        self.filename = os.path.basename(attachment.filename)
+        self.mimetype, _ = mimetypes.guess_type(self.filename)
+        self._content = None
+        if cache:
+            self._content = self._read()
+
+    def _read(self):
+        # go through the storage so that files needn't be on the local disk
+        _file = self.attachment.file
+        with _file.storage.open(_file.name, "rb") as f:
+            return f.read()
+
+    @property
+    def content(self):
+        if self._content is not None:
+            return self._content
+        return self._read()
+
+    @property
+    def file(self):
+        # for ``send_message`` overrides which attach ``attachment.file``
+        return self.attachment.file
+
+
+class BackendConnections:
+    """Email backend connections (``hookset.connection``), one for each send
+    worker, which are opened when first needed and closed on exit."""
+
+    def __init__(self, count: int = 1):
+        self.count = count
+        self._stack = ExitStack()
+        self._connections = None
+
+    def open(self):  # -> list:
+        """Returns the open connections, opening them on first use. Should
+        opening them fail, they are opened again on the next call."""
+        if self._connections is None:
+            try:
+                self._connections = [
+                    self._stack.enter_context(hookset.connection())
+                    for _ in range(self.count)
+                ]
+            except BaseException:
+                self._stack.close()
+                raise
+        return self._connections
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+
+class SendingLog:
+    """Tracks which subscriptions have already received a submission. The
+    subscriptions sent in prior runs are loaded with a single query (limited
+    to ``subscriptions`` when given) and new ``Sending`` records are written
+    in batches."""
+
+    def __init__(
+        self,
+        submission: models.Submission,
+        *,
+        subscriptions=None,
+        batch_size: int = 100,
+    ):
+        self.submission = submission
+        self.batch_size = batch_size
+        sendings = models.Sending.objects.filter(submission=submission)
+        if subscriptions is not None:
+            sendings = sendings.filter(subscription__in=subscriptions)
+        self._sent = set(sendings.values_list("subscription_id", flat=True))
+        self._pending = []
+
+    def __contains__(self, subscription):
+        return subscription.pk in self._sent
+
+    def add(self, subscription):
+        """Marks the subscription as sent, the ``Sending`` record is written
+        once a full batch has accumulated (or upon ``flush``)."""
+        self._sent.add(subscription.pk)
+        self._pending.append(subscription.pk)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes all pending ``Sending`` records."""
+        if not self._pending:
+            return
+        models.Sending.objects.bulk_create(
+            [
+                models.Sending(submission=self.submission, subscription_id=_id)
+                for _id in self._pending
+            ],
+            # recorded already (e.g. by another process), nothing to do
+            ignore_conflicts=True,
+        )
+        self._pending = []
+
+
+class RateLimiter:
+    """Token bucket limiting outgoing email to ``rate`` messages per second
+    (``None`` for no limit) with bursts of up to ``burst`` messages. Time
+    spent between acquisitions, e.g. rendering and sending, counts towards
+    the budget. May be shared between threads."""
+
+    def __init__(self, *, rate=None, burst=1, window=60):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.window = window
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._history = deque()
+
+    def _reserve(self, count, now):
+        """Takes ``count`` tokens, going into debt if need be, and returns
+        the time at which the tokens are actually available."""
+        if self.rate is None:
+            return now
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= count
+        if self._tokens >= 0:
+            return now
+        return now - self._tokens / self.rate
+
+    def _prune(self, now):
+        cutoff = now - self.window
+        while self._history and self._history[0][0] < cutoff:
+            self._history.popleft()
+
+    def acquire(self, count=1):
+        """Blocks until ``count`` messages may be sent."""
+        with self._lock:
+            now = time.monotonic()
+            available = self._reserve(count, now)
+            self._prune(now)
+            self._history.append((available, count))
+        if available > now:
+            time.sleep(available - now)
+
+    def bursts(self, items):
+        """Yields the items in chunks of up to ``burst`` (all at once without
+        a rate), blocking before each chunk until it may be sent."""
+        size = len(items) if self.rate is None else self.burst
+        for start in range(0, len(items), max(size, 1)):
+            end = start + size
+            chunk = items[start:end]
+            self.acquire(len(chunk))
+            yield chunk
+
+    @property
+    def current_rate(self):
+        """Messages per second acquired over the last ``window`` seconds."""
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            return (
+                sum(count for when, count in self._history if when <= now) / self.window
+            )
+
+
+class SharedRateLimiter(RateLimiter):
+    """Token bucket kept in the database so that the budget is shared by
+    every process sending email. Tokens are taken while the bucket row is
+    locked, which requires a database supporting ``SELECT ... FOR UPDATE``
+    (SQLite serializes writes instead). Tokens are taken in a transaction of
+    their own, so ``acquire`` must not be called within another transaction
+    or the bucket row stays locked until that one ends."""
+
+    def __init__(self, *, name="default", **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+
+    def _reserve(self, count, now):
+        if self.rate is None:
+            return now
+        with transaction.atomic():
+            current = timezone.now()
+            buckets = models.RateLimitBucket.objects.select_for_update()
+            bucket, _ = buckets.get_or_create(
+                name=self.name, defaults={"tokens": self.burst, "updated": current}
+            )
+            elapsed = max((current - bucket.updated).total_seconds(), 0)
+            bucket.tokens = min(self.burst, bucket.tokens + elapsed * self.rate) - count
+            bucket.updated = current
+            bucket.save(update_fields=["tokens", "updated"])
+        if bucket.tokens >= 0:
+            return now
+        return now - bucket.tokens / self.rate
+
+
+def get_rate_limiter():  # -> RateLimiter:
+    """Builds the rate limiter described by the settings."""
+    rate = settings.MAILINGLIST_SEND_RATE
+    if rate is None and settings.MAILINGLIST_EMAIL_DELAY:
+        rate = 1 / settings.MAILINGLIST_EMAIL_DELAY
+    burst = settings.MAILINGLIST_SEND_BURST or settings.MAILINGLIST_BATCH_SIZE
+    if settings.MAILINGLIST_SHARED_RATE_LIMIT:
+        return SharedRateLimiter(rate=rate, burst=burst)
+    return RateLimiter(rate=rate, burst=burst)
+
+
+def get_retry_delay(attempts):  # -> timedelta:
+    """Time to wait before the next attempt after ``attempts`` failures,
+    doubling ``MAILINGLIST_RETRY_DELAY`` with each failure."""
+    return timedelta(seconds=settings.MAILINGLIST_RETRY_DELAY * 2 ** (attempts - 1))
+
+
 class SubmissionService:
     """Manages send activities for published submissions."""
 
+    # recipients inserted per query when a submission is published
+    snapshot_chunk_size = 1000
+
+    @cached_property
+    def message_service(self):
+        return MessageService()
+
+    @cached_property
+    def rate_limiter(self):
+        return get_rate_limiter()
+
     def _get_included_subscribers(self, submission):
-        # get current list of subscribers
-        subscriptions = (
-            submission.message.mailing_list.subscriptions.filter(
-                status=SubscriptionStatusEnum.SUBSCRIBED
-            )
-            # remove all global denies
-            .filter(user__mailinglist_deny__isnull=True)
-            # remove all excludes
-            .exclude(pk__in=submission.exclude.all().values_list("id", flat=True))
+        # get current list of subscribers, global denies and excludes are
+        # anti-joins (NOT EXISTS) so large exclude lists stay cheap
+        subscriptions = submission.message.mailing_list.subscriptions.filter(
+            ~Exists(models.GlobalDeny.objects.filter(user=OuterRef("user"))),
+            ~Exists(
+                models.Submission.exclude.through.objects.filter(
+                    submission=submission, subscription=OuterRef("pk")
+                )
+            ),
+            status=SubscriptionStatusEnum.SUBSCRIBED,
         )
+        if submission.snapshot_taken is not None:
+            # only those recorded at publish time which are still subscribed
+            subscriptions = subscriptions.filter(
+                Exists(
+                    models.Recipient.objects.filter(
+                        submission=submission, subscription=OuterRef("pk")
+                    )
+                )
+            )
         return subscriptions
 
-    def _send_message(self, *, message, subscription, template_set, **kwargs):
-        hookset.send_message(
-            from_email=subscription.mailing_list.sender_tag,
-            **MessageService().prepare_message_kwargs(
+    def _take_snapshot(self, submission):
+        """Records the current subscribers of the submission (``Recipient``),
+        inserted in chunks of ``snapshot_chunk_size``. Any earlier snapshot is
+        replaced."""
+        with transaction.atomic():
+            submission.recipients.all().delete()
+            submission.snapshot_taken = None
+            subscriptions = (
+                self._get_included_subscribers(submission)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            )
+            after = 0
+            while True:
+                pks = list(
+                    subscriptions.filter(pk__gt=after)[: self.snapshot_chunk_size]
+                )
+                if not pks:
+                    break
+                models.Recipient.objects.bulk_create(
+                    models.Recipient(submission=submission, subscription_id=pk)
+                    for pk in pks
+                )
+                after = pks[-1]
+            submission.snapshot_taken = now()
+            submission.save(update_fields=["snapshot_taken"])
+
+    def _get_unsent_subscribers(self, submission):
+        return self._get_included_subscribers(submission).filter(
+            ~Exists(
+                models.Sending.objects.filter(
+                    submission=submission, subscription=OuterRef("pk")
+                )
+            )
+        )
+
+    def _get_failures(self, submission, **kwargs):
+        return models.SendingFailure.objects.filter(
+            submission=submission, subscription=OuterRef("pk"), **kwargs
+        )
+
+    def _get_claimable_subscribers(self, submission, *, after=0, retry=False):
+        """Unsent subscribers with primary keys greater than ``after``, in
+        order. Subscribers which failed to send are left out, unless ``retry``
+        in which case only those due for a retry are included. Subscribers
+        claimed by another process are left out as well."""
+        if retry:
+            failures = Exists(
+                self._get_failures(
+                    submission,
+                    status=SendingFailureStatusEnum.RETRYING,
+                    next_attempt__lte=now(),
+                )
+            )
+        else:
+            failures = ~Exists(self._get_failures(submission))
+        claimed = Exists(
+            models.Recipient.objects.filter(
+                submission=submission,
+                subscription=OuterRef("pk"),
+                claimed_until__gt=now(),
+            )
+        )
+        return (
+            self._get_unsent_subscribers(submission)
+            .filter(failures, ~claimed, pk__gt=after)
+            .select_related("user")
+            # only what sending needs, templates may ask for more
+            .only(
+                "token",
+                "mailing_list",
+                "user__email",
+                *settings.MAILINGLIST_SEND_FIELDS,
+            )
+            .order_by("pk")
+        )
+
+    def _claim_subscribers(self, submission, *, after=0, retry=False):
+        """Claims up to ``MAILINGLIST_BATCH_SIZE`` claimable subscribers for
+        ``MAILINGLIST_CLAIM_TIMEOUT`` seconds, so that other processes sending
+        the same submission pass them over. The claim is made in a short
+        transaction of its own, locking the subscribers while it is recorded
+        and skipping those locked by other processes. Returns the claimed
+        subscribers along with the primary key of the last subscriber scanned
+        (``None`` once there are none left), from which to claim the next
+        chunk."""
+        lock_kwargs = {"skip_locked": True}
+        if connection.features.has_select_for_update_of:
+            # leave the joined user/deny rows unlocked
+            lock_kwargs["of"] = ("self",)
+        with transaction.atomic():
+            subscriptions = self._get_claimable_subscribers(
+                submission, after=after, retry=retry
+            ).select_for_update(**lock_kwargs)
+            subscriptions = list(subscriptions[: settings.MAILINGLIST_BATCH_SIZE])
+            last_pk = subscriptions[-1].pk if subscriptions else None
+            recipients = models.Recipient.objects.filter(
+                submission=submission, subscription__in=subscriptions
+            )
+            # another process may have claimed these before the lock
+            claimed = set(
+                recipients.filter(claimed_until__gt=now()).values_list(
+                    "subscription_id", flat=True
+                )
+            )
+            subscriptions = [s for s in subscriptions if s.pk not in claimed]
+            recipients.filter(subscription__in=subscriptions).update(
+                claimed_until=now()
+                + timedelta(seconds=settings.MAILINGLIST_CLAIM_TIMEOUT)
+            )
+        mailing_list = submission.message.mailing_list
+        for subscription in subscriptions:
+            # all share the mailing list of the message, no need to query it
+            subscription.mailing_list = mailing_list
+        return subscriptions, last_pk
+
+    def _prepare_message(self, *, message, subscription, template_set, **kwargs):
+        """Composes the keyword arguments for sending the message to the
+        subscription with ``hookset.send_message``."""
+        return {
+            "from_email": subscription.mailing_list.sender_tag,
+            **self.message_service.prepare_message_kwargs(
                 message=message, subscription=subscription, template_set=template_set
             ),
             **kwargs,
+        }
+
+    def _send_shard(self, messages, *, connection):
+        return hookset.send_messages(messages, connection=connection)
+
+    def _deliver(self, messages, *, connections, executor=None):
+        """Hands the messages to the hookset for delivery, returning the
+        result for each message. The messages are sent in bursts no larger
+        than the rate limiter allows."""
+        results = []
+        # the (possibly database backed) limiter is only used by this thread
+        for burst in self.rate_limiter.bursts(messages):
+            results.extend(
+                self._deliver_burst(burst, connections=connections, executor=executor)
+            )
+        return results
+
+    def _deliver_burst(self, messages, *, connections, executor=None):
+        """Hands the messages to the hookset for delivery, returning the
+        result for each message. With an executor the messages are split
+        into one shard per connection and the shards are sent concurrently."""
+        if executor is None:
+            return self._send_shard(messages, connection=connections[0])
+        shard_count = len(connections)
+        futures = {}
+        for index, backend_connection in enumerate(connections):
+            shard = messages[index::shard_count]
+            if shard:
+                futures[index] = executor.submit(
+                    self._send_shard, shard, connection=backend_connection
+                )
+        results = [None] * len(messages)
+        for index, future in futures.items():
+            try:
+                shard_results = future.result()
+            except (SMTPException, OSError) as e:
+                # no telling which messages were sent, treat all as failed
+                shard_results = [e] * len(messages[index::shard_count])
+            results[index::shard_count] = shard_results
+        return results
+
+    def _advance_cursor(self, submission, *, after):
+        """Moves the cursor of the submission up to just before the first
+        subscriber which is yet to be processed (is unsent, including those
+        locked by other processes, and has not failed), or to ``after`` if
+        there are none."""
+        first_unprocessed = (
+            self._get_unsent_subscribers(submission)
+            .filter(~Exists(self._get_failures(submission)), pk__gt=submission.cursor)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+            .first()
+        )
+        cursor = after if first_unprocessed is None else first_unprocessed - 1
+        if cursor <= submission.cursor:
+            return
+        # other processes may have moved the cursor further already
+        models.Submission.objects.filter(pk=submission.pk).update(
+            cursor=Greatest("cursor", cursor)
         )
+        submission.cursor = cursor
 
-    def _ensure_sent(self, *, subscription, submission, **kwargs):
-        """Idempotent sending of message, returns ``True`` if email was
-        actually sent (returns ``False`` if email was sent previously)."""
-        # check if this has been sent already
-        sending_kwargs = {
-            "submission": submission,
-            "subscription": subscription,
+    def _record_failures(self, submission, failures):
+        """Records the ``(subscription, error)`` pairs which failed to send,
+        scheduling another attempt with exponential backoff or giving up
+        after ``MAILINGLIST_MAX_ATTEMPTS`` attempts."""
+        if not failures:
+            return
+        records = {
+            record.subscription_id: record
+            for record in models.SendingFailure.objects.filter(
+                submission=submission,
+                subscription__in=[subscription for subscription, _ in failures],
+            )
         }
-        if models.Sending.objects.filter(**sending_kwargs).exists():
-            return False
-        # send email
-        self._send_message(
-            message=submission.message, subscription=subscription, **kwargs
-        )
-        # log sending of email
-        models.Sending.objects.create(**sending_kwargs)
-        return True
-
-    def _rate_limit(self, total_send_count):
-        batch_sleep = False
-        if settings.MAILINGLIST_BATCH_DELAY is not None:
-            if total_send_count % settings.MAILINGLIST_BATCH_SIZE == 0:
-                batch_sleep = True
-                time.sleep(settings.MAILINGLIST_BATCH_DELAY)
-        if not batch_sleep and settings.MAILINGLIST_EMAIL_DELAY is not None:
-            time.sleep(settings.MAILINGLIST_EMAIL_DELAY)
+        for subscription, error in failures:
+            record = records.get(subscription.pk) or models.SendingFailure(
+                submission=submission, subscription=subscription
+            )
+            record.attempts += 1
+            record.last_error = repr(error)
+            if record.attempts >= settings.MAILINGLIST_MAX_ATTEMPTS:
+                record.status = SendingFailureStatusEnum.DEAD
+                record.next_attempt = None
+                logger.error(
+                    "Giving up on subscription %d after %d attempts: %r",
+                    subscription.pk,
+                    record.attempts,
+                    error,
+                )
+            else:
+                record.next_attempt = now() + get_retry_delay(record.attempts)
+                logger.warning(
+                    "Failed to send to subscription %d, will retry: %r",
+                    subscription.pk,
+                    error,
+                )
+            record.save()
+        # the retry may be due before the claim would expire
+        models.Recipient.objects.filter(
+            submission=submission,
+            subscription__in=[subscription for subscription, _ in failures],
+        ).update(claimed_until=None)
+
+    def _record_sent(self, sending_log, sent, *, retry=False):
+        """Writes the ``Sending`` records of the subscriptions sent, forgetting
+        earlier failures when ``retry``."""
+        for subscription in sent:
+            sending_log.add(subscription)
+        sending_log.flush()
+        if retry:
+            models.SendingFailure.objects.filter(
+                submission=sending_log.submission, subscription__in=sent
+            ).delete()
+
+    def _send_batch(
+        self, batch, *, sending_log, connections, executor=None, retry=False
+    ):
+        """Delivers a batch of ``(subscription, message_kwargs)`` pairs over
+        the ``BackendConnections``, then records each message that was sent as
+        well as each which failed in a short transaction. No transaction is
+        held open while sending. Should the connections fail to open, the
+        whole batch has failed. Returns the subscriptions sent."""
+        messages = [message_kwargs for _, message_kwargs in batch]
+        try:
+            # nothing to connect for when all were sent elsewhere
+            backend_connections = connections.open() if messages else []
+        except (SMTPException, OSError) as e:
+            logger.warning("Failed to connect for sending a submission: %r", e)
+            results = [e] * len(messages)
+        else:
+            results = self._deliver(
+                messages, connections=backend_connections, executor=executor
+            )
+        sent = []
+        failures = []
+        for (subscription, _), result in zip(batch, results):
+            if result is None:
+                sent.append(subscription)
+            else:
+                failures.append((subscription, result))
+        with transaction.atomic():
+            self._record_sent(sending_log, sent, retry=retry)
+            self._record_failures(sending_log.submission, failures)
+        return sent
+
+    def _queue_batch(self, batch, *, submission, sending_log, retry=False):
+        """Writes a batch of ``(subscription, message_kwargs)`` pairs to the
+        outbox, recording them as sent in the same transaction. Attachments
+        are loaded by ``OutboxService`` when the email is sent, should it give
+        up on the email the subscription is recorded as failed instead."""
+        sent = [subscription for subscription, _ in batch]
+        with transaction.atomic():
+            models.OutboxMessage.objects.bulk_create(
+                [
+                    models.OutboxMessage(
+                        submission=submission,
+                        subscription=subscription,
+                        payload={
+                            key: value
+                            for key, value in message_kwargs.items()
+                            if key != "attachments"
+                        },
+                    )
+                    for subscription, message_kwargs in batch
+                ]
+            )
+            self._record_sent(sending_log, sent, retry=retry)
+        return sent
+
+    def _batch_delay(self, previous_send_count, send_count):
+        """Pauses for ``MAILINGLIST_BATCH_DELAY`` seconds each time another
+        ``MAILINGLIST_BATCH_SIZE`` messages have been sent."""
+        if settings.MAILINGLIST_BATCH_DELAY is None:
+            return
+        batch_size = settings.MAILINGLIST_BATCH_SIZE
+        if send_count // batch_size > previous_send_count // batch_size:
+            time.sleep(settings.MAILINGLIST_BATCH_DELAY)
+
+    def _load_attachments(self, message):
+        """Reads the attachments of the message from storage once, so that
+        they can be reused for every outgoing email. Attachments beyond the
+        ``MAILINGLIST_ATTACHMENT_CACHE_SIZE`` budget are read for each email
+        instead."""
+        budget = settings.MAILINGLIST_ATTACHMENT_CACHE_SIZE
+        payloads = []
+        for attachment in message.attachments.all():
+            size = attachment.file.size
+            cache = size <= budget
+            if cache:
+                budget -= size
+            payloads.append(AttachmentPayload(attachment, cache=cache))
+        return payloads
+
+    def _process_pass(
+        self,
+        submission,
+        *,
+        retry,
+        send_count,
+        template_set,
+        attachments,
+        connections,
+        executor,
+    ):  # -> int:
+        """Claims and sends (or queues) one chunk of subscribers at a time
+        until none are left, either the unsent subscribers or, when ``retry``,
+        those due for a retry. Returns the updated send count."""
+        queue = settings.MAILINGLIST_QUEUE_SUBMISSIONS
+        # recipients are walked in primary key order, one chunk at a time,
+        # resuming from the cursor of the submission
+        after = 0 if retry else submission.cursor
+        while True:
+            subscriptions, last_pk = self._claim_subscribers(
+                submission, after=after, retry=retry
+            )
+            if last_pk is None:
+                return send_count
+            after = last_pk
+            if not subscriptions:
+                # all claimed by other processes, carry on past them
+                continue
+            # another process may have sent to these before the claim
+            sending_log = SendingLog(
+                submission,
+                subscriptions=subscriptions,
+                batch_size=settings.MAILINGLIST_BATCH_SIZE,
+            )
+            batch = [
+                (
+                    subscription,
+                    self._prepare_message(
+                        message=submission.message,
+                        subscription=subscription,
+                        template_set=template_set,
+                        attachments=attachments,
+                    ),
+                )
+                for subscription in subscriptions
+                if subscription not in sending_log
+            ]
+            if queue:
+                sent = self._queue_batch(
+                    batch, submission=submission, sending_log=sending_log, retry=retry
+                )
+            else:
+                sent = self._send_batch(
+                    batch,
+                    sending_log=sending_log,
+                    connections=connections,
+                    executor=executor,
+                    retry=retry,
+                )
+            if not retry:
+                self._advance_cursor(submission, after=after)
+            previous_send_count = send_count
+            send_count += len(sent)
+            if queue:
+                continue
+            logger.info(
+                "Sent %d messages, currently %.2f messages per second",
+                send_count,
+                self.rate_limiter.current_rate,
+            )
+            self._batch_delay(previous_send_count, send_count)
+
+    def _is_finished(self, submission):  # -> bool:
+        """Whether no subscribers remain to be sent the submission. Those
+        claimed by other processes (or passed over while claimed by a process
+        which then failed) count as unsent, as do those which are to be
+        retried; those behind the cursor have been processed."""
+        unsent = self._get_unsent_subscribers(submission)
+        unprocessed = unsent.filter(
+            ~Exists(self._get_failures(submission)), pk__gt=submission.cursor
+        )
+        retrying = unsent.filter(
+            Exists(
+                self._get_failures(submission, status=SendingFailureStatusEnum.RETRYING)
+            )
+        )
+        return not unprocessed.exists() and not retrying.exists()
 
     def process_submission(
         self, submission: models.Submission, *, send_count: int = 0
     ):  # -> int:
-        """Sends submitted message to each (non-excluded) subscriber,
-        observing rate limits configured in settings."""
+        """Sends submitted message to each (non-excluded) subscriber in
+        batches of ``MAILINGLIST_BATCH_SIZE``, observing rate limits
+        configured in settings. Batches are shared among
+        ``MAILINGLIST_SEND_WORKERS`` threads, each with its own connection.
+
+        Each batch of subscribers is claimed for ``MAILINGLIST_CLAIM_TIMEOUT``
+        seconds, so several processes may work on the same submission at
+        once. The email is sent outside of any transaction and the batch is
+        recorded as sent right after. Should the process die in between, the
+        batch is sent again once the claim expires. Subscribers which fail to
+        send are retried in later runs, with exponential backoff. The
+        submission is marked sent once no subscribers remain unsent (other
+        than those given up on).
+
+        With ``MAILINGLIST_QUEUE_SUBMISSIONS`` the email is written to the
+        outbox (and sent by ``OutboxService``) instead."""
         submission.status = SubmissionStatusEnum.SENDING
-        submission.save()
-        subscriptions = self._get_included_subscribers(submission)
-        template_set = TemplateSet(mailing_list=submission.message.mailing_list)
-        attachments = list(submission.message.attachments.all())
-        for subscription in subscriptions:
-            did_send = self._ensure_sent(
-                submission=submission,
-                subscription=subscription,
-                template_set=template_set,
-                attachments=attachments,
-            )
-            if not did_send:
-                continue
-            send_count += 1
-            self._rate_limit(send_count)
-        submission.status = SubmissionStatusEnum.SENT
-        submission.save()
+        submission.save(update_fields=["status"])
+        if submission.snapshot_taken is None:
+            # published before recipients were recorded
+            self._take_snapshot(submission)
+        queue = settings.MAILINGLIST_QUEUE_SUBMISSIONS
+        template_set = SubmissionTemplateSet(message=submission.message)
+        attachments = None
+        workers = 0
+        if not queue:
+            attachments = self._load_attachments(submission.message)
+            workers = settings.MAILINGLIST_SEND_WORKERS
+        with ExitStack() as stack:
+            # each worker gets its own connection, opened once there is
+            # something to send
+            connections = stack.enter_context(BackendConnections(workers))
+            executor = None
+            if workers > 1:
+                executor = stack.enter_context(ThreadPoolExecutor(max_workers=workers))
+            # first the unsent subscribers, then those due for a retry
+            for retry in (False, True):
+                send_count = self._process_pass(
+                    submission,
+                    retry=retry,
+                    send_count=send_count,
+                    template_set=template_set,
+                    attachments=attachments,
+                    connections=connections,
+                    executor=executor,
+                )
+        if self._is_finished(submission):
+            submission.status = SubmissionStatusEnum.SENT
+            submission.save(update_fields=["status"])
         return send_count
 
     def _get_outstanding_submissions(self):
@@ -407,7 +1269,9 @@ class SubmissionService:
             )
 
     def publish(self, submission: models.Submission):  # -> None:
-        """Mark a ``Submission`` for sending."""
+        """Mark a ``Submission`` for sending, recording the subscribers it
+        will be sent to."""
+        self._take_snapshot(submission)
         submission.published = now()
         submission.status = SubmissionStatusEnum.PENDING
         submission.save()
@@ -416,3 +1280,137 @@ class SubmissionService:
         """Creates a ``Submission`` instance for a given ``Message`` instance."""
         submission, _ = models.Submission.objects.get_or_create(message=message)
         return submission
+
+
+class OutboxService:
+    """Queues email to be sent later (e.g. outside of a web request, or apart
+    from rendering a submission) and sends the queued email, retrying
+    failures with exponential backoff."""
+
+    @cached_property
+    def rate_limiter(self):
+        return get_rate_limiter()
+
+    def enqueue(
+        self, *, submission: models.Submission = None, **message_kwargs
+    ):  # -> models.OutboxMessage:
+        """Stores the keyword arguments for ``hookset.send_message``, along
+        with the submission (if any) whose attachments are to be sent."""
+        return models.OutboxMessage.objects.create(
+            payload=message_kwargs, submission=submission
+        )
+
+    def _claim_messages(self):
+        """Claims up to ``MAILINGLIST_BATCH_SIZE`` due messages for
+        ``MAILINGLIST_CLAIM_TIMEOUT`` seconds by moving their next attempt
+        forward, in a short transaction skipping messages locked by other
+        processes."""
+        with transaction.atomic():
+            queued = list(
+                models.OutboxMessage.objects.filter(next_attempt__lte=now())
+                .order_by("pk")
+                .select_for_update(skip_locked=True)[: settings.MAILINGLIST_BATCH_SIZE]
+            )
+            models.OutboxMessage.objects.filter(
+                pk__in=[outbox_message.pk for outbox_message in queued]
+            ).update(
+                next_attempt=now()
+                + timedelta(seconds=settings.MAILINGLIST_CLAIM_TIMEOUT)
+            )
+        return queued
+
+    def _prepare_payload(self, outbox_message, *, attachments):
+        if outbox_message.submission_id is None:
+            return outbox_message.payload
+        if outbox_message.submission_id not in attachments:
+            attachments[
+                outbox_message.submission_id
+            ] = SubmissionService()._load_attachments(outbox_message.submission.message)
+        return {
+            **outbox_message.payload,
+            "attachments": attachments[outbox_message.submission_id],
+        }
+
+    def _give_up_sending(self, outbox_message):
+        """Records the subscription of a submission email which was given up
+        on as failed (``SendingFailure``) rather than sent."""
+        lookup = {
+            "submission_id": outbox_message.submission_id,
+            "subscription_id": outbox_message.subscription_id,
+        }
+        models.Sending.objects.filter(**lookup).delete()
+        models.SendingFailure.objects.update_or_create(
+            **lookup,
+            defaults={
+                "status": SendingFailureStatusEnum.DEAD,
+                "attempts": outbox_message.attempts,
+                "next_attempt": None,
+                "last_error": outbox_message.last_error,
+            },
+        )
+
+    def _reschedule(self, outbox_message, error):
+        outbox_message.attempts += 1
+        outbox_message.last_error = repr(error)
+        if outbox_message.attempts >= settings.MAILINGLIST_MAX_ATTEMPTS:
+            outbox_message.next_attempt = None
+            logger.error(
+                "Giving up on queued email %d after %d attempts: %r",
+                outbox_message.pk,
+                outbox_message.attempts,
+                error,
+            )
+            if outbox_message.subscription_id is not None:
+                self._give_up_sending(outbox_message)
+        else:
+            outbox_message.next_attempt = now() + get_retry_delay(
+                outbox_message.attempts
+            )
+        outbox_message.save(update_fields=["attempts", "last_error", "next_attempt"])
+
+    def process_outbox(self):  # -> int:
+        """Sends queued email in batches of ``MAILINGLIST_BATCH_SIZE`` over a
+        single connection, observing rate limits configured in settings.
+        Each batch is claimed for ``MAILINGLIST_CLAIM_TIMEOUT`` seconds, so
+        several processes may share the outbox, and sent outside of any
+        transaction. Should the process die before the batch is recorded, it
+        is sent again once the claim expires. Email which fails to send is
+        retried later, up to ``MAILINGLIST_MAX_ATTEMPTS`` times. No connection
+        is opened while the outbox is empty, should opening one fail the
+        claimed email is retried later as well."""
+        send_count = 0
+        # attachments of each submission, read once
+        attachments = {}
+        queued = self._claim_messages()
+        if not queued:
+            return send_count
+        with ExitStack() as stack:
+            try:
+                backend_connection = stack.enter_context(hookset.connection())
+            except Exception as e:
+                logger.warning("Failed to connect for sending queued email: %r", e)
+                with transaction.atomic():
+                    for outbox_message in queued:
+                        self._reschedule(outbox_message, e)
+                return send_count
+            while queued:
+                payloads = [
+                    self._prepare_payload(outbox_message, attachments=attachments)
+                    for outbox_message in queued
+                ]
+                results = []
+                for burst in self.rate_limiter.bursts(payloads):
+                    results.extend(
+                        hookset.send_messages(burst, connection=backend_connection)
+                    )
+                sent = []
+                with transaction.atomic():
+                    for outbox_message, result in zip(queued, results):
+                        if result is None:
+                            sent.append(outbox_message.pk)
+                        else:
+                            self._reschedule(outbox_message, result)
+                    models.OutboxMessage.objects.filter(pk__in=sent).delete()
+                send_count += len(sent)
+                queued = self._claim_messages()
+        return send_count
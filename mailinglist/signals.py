@@ -0,0 +1,19 @@
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from mailinglist import models
+from mailinglist.services import clear_template_cache
+
+
+@receiver(post_save, sender=models.MailingList)
+@receiver(post_delete, sender=models.MailingList)
+def mailing_list_changed(sender, instance, **kwargs):
+    # entries are keyed by slug, a renamed list resolves its templates afresh
+    clear_template_cache(slugs=[instance.slug])
+
+
+@receiver(setting_changed)
+def templates_setting_changed(sender, setting, **kwargs):
+    if setting == "TEMPLATES":
+        clear_template_cache()
@@ -1,4 +1,4 @@
-from mailinglist.services import SubmissionService
+from mailinglist.services import OutboxService, SubmissionService
 
 try:
     from celery import shared_task
@@ -9,3 +9,7 @@ else:
     @shared_task
     def process_submissions():
         SubmissionService().process_submissions()
+
+    @shared_task
+    def process_outbox():
+        OutboxService().process_outbox()
@@ -1,6 +1,8 @@
 from django.http import Http404
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.utils.timezone import now
+from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import DetailView, FormView, ListView, TemplateView
 from django.views.generic.detail import (
     SingleObjectMixin,
@@ -153,10 +155,12 @@ class SubscribeConfirmView(IsSubscriptionMixin, TemplateView):
         return super().get(request, *args, **kwargs)
 
 
+@method_decorator(csrf_exempt, name="dispatch")
 class UnsubscribeView(IsSubscriptionMixin, TemplateView):
     """Reachable when user clicks unsubscribe link in any sent message.
     Deactivates user's subscription to the mailing list and provides link
-    to user's subscriptions page"""
+    to user's subscriptions page. Also accepts the one-click unsubscribe
+    POST sent by mail clients (RFC8058)."""
 
     # Do not want _any_ subscription data leaking into the UI, so keep
     #   it a simple template view
@@ -166,6 +170,9 @@ class UnsubscribeView(IsSubscriptionMixin, TemplateView):
         self.subscription = SubscriptionService().unsubscribe(token=kwargs.get("token"))
         return super().get(request, *args, **kwargs)
 
+    def post(self, request, *args, **kwargs):
+        return self.get(request, *args, **kwargs)
+
 
 class ArchivesView(ListView):
     """Allows user to browse messages published on a mailing list."""
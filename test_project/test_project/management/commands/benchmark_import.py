@@ -0,0 +1,50 @@
+from tempfile import TemporaryFile
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from mailinglist import models
+from mailinglist.addressimport.parsers import parse_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the per row cost of parsing a generated CSV file of addresses "
+        "for import. Nothing is kept in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+
+    def handle(self, *args, rows, **options):
+        with TemporaryFile() as csv_file:
+            csv_file.write(b"email,first_name,last_name\r\n")
+            for i in range(rows):
+                csv_file.write(b"person-%d@example.com,First,Last\r\n" % i)
+            size = csv_file.tell()
+            csv_file.seek(0)
+
+            def progress(*, rows, bytes_read):
+                self.stdout.write(f"{rows} rows, {bytes_read / size:.0%} read")
+
+            with transaction.atomic():
+                mailing_list = models.MailingList.objects.create(
+                    name="Benchmark",
+                    slug="benchmark",
+                    email="benchmark@example.com",
+                    sender="Benchmark",
+                )
+                started = perf_counter()
+                addresses = parse_csv(
+                    csv_file,
+                    mailing_list,
+                    progress=progress,
+                    progress_interval=max(rows // 10, 1),
+                )
+                elapsed = perf_counter() - started
+                transaction.set_rollback(True)
+        self.stdout.write(
+            f"Parsed {len(addresses)} addresses ({size} bytes) in {elapsed:.2f}s "
+            f"({elapsed / max(rows, 1) * 1_000_000:.1f}µs per row)"
+        )
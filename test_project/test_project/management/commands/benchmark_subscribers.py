@@ -0,0 +1,141 @@
+from time import perf_counter
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from mailinglist import models
+from mailinglist.conf import settings
+from mailinglist.enum import SubscriptionStatusEnum
+from mailinglist.services import SubmissionService
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the plan and timing of the subscriber selection query for a "
+        "generated mailing list. Nothing is kept in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subscriptions", type=int, default=1_000_000)
+        parser.add_argument("--chunk-size", type=int, default=10_000)
+        parser.add_argument(
+            "--excludes",
+            type=int,
+            default=0,
+            help="Number of subscriptions excluded from the submission.",
+        )
+        parser.add_argument(
+            "--snapshot",
+            action="store_true",
+            help="Record the recipients, as publishing the submission does.",
+        )
+
+    def handle(self, *args, subscriptions, chunk_size, excludes, snapshot, **options):
+        with transaction.atomic():
+            submission = self._populate(subscriptions, chunk_size)
+            self._exclude(submission, excludes, chunk_size)
+            if snapshot:
+                started = perf_counter()
+                SubmissionService()._take_snapshot(submission)
+                self.stdout.write(
+                    f"Recorded {submission.recipients.count()} recipients "
+                    f"in {perf_counter() - started:.2f}s"
+                )
+            self._benchmark(submission)
+            transaction.set_rollback(True)
+
+    def _populate(self, count, chunk_size):
+        user_model = apps.get_model(settings.MAILINGLIST_USER_MODEL)
+        has_username = any(f.name == "username" for f in user_model._meta.fields)
+        mailing_list = models.MailingList.objects.create(
+            name="Benchmark",
+            slug="benchmark",
+            email="benchmark@example.com",
+            sender="Benchmark",
+        )
+        message = models.Message.objects.create(
+            title="Benchmark", slug="benchmark", mailing_list=mailing_list
+        )
+        submission = models.Submission.objects.create(message=message)
+        statuses = (
+            SubscriptionStatusEnum.SUBSCRIBED,
+            SubscriptionStatusEnum.SUBSCRIBED,
+            SubscriptionStatusEnum.SUBSCRIBED,
+            SubscriptionStatusEnum.UNSUBSCRIBED,
+            SubscriptionStatusEnum.PENDING,
+        )
+        started = perf_counter()
+        for start in range(0, count, chunk_size):
+            users = []
+            for i in range(start, min(start + chunk_size, count)):
+                user = user_model(email=f"benchmark-{i}@example.com")
+                if has_username:
+                    user.username = f"benchmark-{i}"
+                users.append(user)
+            users = user_model.objects.bulk_create(users)
+            if not all(user.pk for user in users):
+                # backends which don't return primary keys from bulk inserts
+                users = user_model.objects.filter(
+                    email__in=[user.email for user in users]
+                ).order_by("pk")
+            models.Subscription.objects.bulk_create(
+                models.Subscription(
+                    user=user,
+                    mailing_list=mailing_list,
+                    token=f"benchmark-{start + i}",
+                    status=statuses[(start + i) % len(statuses)],
+                )
+                for i, user in enumerate(users)
+            )
+            models.GlobalDeny.objects.bulk_create(
+                models.GlobalDeny(user=user)
+                for i, user in enumerate(users)
+                if (start + i) % 100 == 0
+            )
+        self.stdout.write(
+            f"Created {count} subscriptions on {connection.vendor} "
+            f"in {perf_counter() - started:.2f}s"
+        )
+        return submission
+
+    def _exclude(self, submission, count, chunk_size):
+        # spread the excludes across the whole list
+        subscriptions = submission.message.mailing_list.subscriptions.order_by("?")
+        pks = list(subscriptions.values_list("pk", flat=True)[:count])
+        through = models.Submission.exclude.through
+        for start in range(0, len(pks), chunk_size):
+            through.objects.bulk_create(
+                through(submission=submission, subscription_id=pk)
+                for pk in pks[start : start + chunk_size]
+            )
+        if pks:
+            self.stdout.write(f"Excluded {len(pks)} subscriptions")
+
+    def _benchmark(self, submission):
+        service = SubmissionService()
+        queryset = service._get_claimable_subscribers(submission)
+        self.stdout.write("Selection query plan:")
+        self.stdout.write(queryset[: settings.MAILINGLIST_BATCH_SIZE].explain())
+
+        started = perf_counter()
+        count = queryset.count()
+        self.stdout.write(
+            f"Counted {count} recipients in {perf_counter() - started:.3f}s"
+        )
+
+        # walk the list the way process_submission does, one claim per chunk
+        started = perf_counter()
+        after = chunks = 0
+        while True:
+            with transaction.atomic():
+                _, last_pk = service._claim_subscribers(submission, after=after)
+            if last_pk is None:
+                break
+            after = last_pk
+            chunks += 1
+        elapsed = perf_counter() - started
+        self.stdout.write(
+            f"Claimed {chunks} chunks of up to {settings.MAILINGLIST_BATCH_SIZE} "
+            f"in {elapsed:.3f}s ({elapsed / max(chunks, 1) * 1000:.2f}ms per chunk)"
+        )
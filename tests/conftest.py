@@ -7,10 +7,18 @@ from django.core.files.base import ContentFile
 from django.contrib.auth import get_user_model
 from django.utils.timezone import now
 
-from mailinglist import models
+from mailinglist import models, services
 from mailinglist.enum import SubmissionStatusEnum, SubscriptionStatusEnum
 
 
+@pytest.fixture(autouse=True)
+def template_cache():
+    # tests mock the template loader, keep that from leaking between tests
+    services.clear_template_cache()
+    yield
+    services.clear_template_cache()
+
+
 @pytest.fixture
 def user_factory(db):
     def _user_factory(**kwargs):
@@ -66,6 +74,20 @@ def subscription(user, mailing_list):
     subscription.delete()
 
 
+@pytest.fixture
+def subscription_factory(user_factory, mailing_list):
+    def _subscription_factory(**kwargs):
+        user = user_factory()
+        return models.Subscription.objects.create(
+            user=user,
+            mailing_list=mailing_list,
+            token=f"token-{user.pk}",
+            **kwargs,
+        )
+
+    return _subscription_factory
+
+
 @pytest.fixture
 def denied_subscription(denied_user, mailing_list):
     subscription = models.Subscription.objects.create(
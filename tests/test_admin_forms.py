@@ -88,6 +88,20 @@ class TestImportForm:
         p_parse_csv.return_value = {"data": "values"}
         ret = form.clean()
         assert form.addresses == {"data": "values"}
+        assert p_parse_csv.call_args.kwargs == {"encoding": "utf-8-sig"}
+
+    @patch("mailinglist.admin_forms.parse_csv")
+    def test_clean_encoding(self, p_parse_csv, address_file, mailing_list):
+        form = ImportForm()
+        form.cleaned_data = {
+            "address_file": address_file,
+            "ignore_errors": True,
+            "mailing_list": mailing_list,
+            "encoding": "cp1252",
+        }
+        p_parse_csv.return_value = {"data": "values"}
+        form.clean()
+        assert p_parse_csv.call_args.kwargs == {"encoding": "cp1252"}
 
     def test_get_addresses_default(self):
         form = ImportForm()
@@ -20,3 +20,10 @@ class TestMailinglistAppConf:
     def test_configure_base_url_fails(self):
         with pytest.raises(ImproperlyConfigured):
             MailinglistAppConf().configure_base_url(None)
+
+    def test_configure_send_workers(self):
+        assert MailinglistAppConf().configure_send_workers(4) == 4
+
+    def test_configure_send_workers_fails(self):
+        with pytest.raises(ImproperlyConfigured):
+            MailinglistAppConf().configure_send_workers(0)
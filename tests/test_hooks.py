@@ -1,6 +1,8 @@
-from unittest.mock import patch, Mock
+from smtplib import SMTPException, SMTPServerDisconnected
+from unittest.mock import call, patch, Mock
 import pytest
 from mailinglist.hooks import MailinglistDefaultHookset
+from mailinglist.services import AttachmentPayload
 from django.core.exceptions import ValidationError
 from django.test import override_settings
 
@@ -45,6 +47,35 @@ class TestMailinglistDefaultHookset:
         p_get_model.assert_called_once_with("custom.override")
         assert user == "asdf"
 
+    def test_bulk_create_users(self, user, django_assert_num_queries):
+        users = [
+            {"email": "new@email.com", "first_name": "new", "last_name": "user"},
+            {"email": user.email, "first_name": "other", "last_name": "name"},
+            {"email": "other@email.com", "first_name": "other", "last_name": "name"},
+        ]
+        with django_assert_num_queries(2):
+            created = MailinglistDefaultHookset().bulk_create_users(users)
+        assert [u.email for u in created] == [u["email"] for u in users]
+        assert created[1].pk == user.pk
+        assert created[1].first_name == user.first_name  # didn't get updated
+        assert created[0].pk and created[0].first_name == "new"
+        created[0].delete()
+        created[2].delete()
+
+    def test_bulk_create_users_overridden(self, db):
+        class Hookset(MailinglistDefaultHookset):
+            create_user = Mock(side_effect=lambda **kwargs: kwargs["email"])
+
+        users = [
+            {"email": "new@email.com", "first_name": "new", "last_name": "user"},
+            {"email": "other@email.com", "first_name": "other", "last_name": "name"},
+        ]
+        assert Hookset().bulk_create_users(users) == [
+            "new@email.com",
+            "other@email.com",
+        ]
+        assert Hookset.create_user.call_args_list == [call(**u) for u in users]
+
     @patch("mailinglist.hooks.EmailMultiAlternatives")
     def test_send_message(self, p_email_alternatives, message_attachment):
         _message = Mock()
@@ -55,7 +86,7 @@ class TestMailinglistDefaultHookset:
             subject="[mailinglist] subject or whatever",
             from_email="loving@it.com",
             html_body="good <strong>strong</strong> body here!",
-            attachments=[message_attachment],
+            attachments=[AttachmentPayload(message_attachment)],
             headers={"header": "yes"},
         )
         p_email_alternatives.assert_called_once_with(
@@ -64,8 +95,11 @@ class TestMailinglistDefaultHookset:
             subject="[mailinglist] subject or whatever",
             from_email="loving@it.com",
             headers={"header": "yes"},
+            connection=None,
+        )
+        _message.attach.assert_called_once_with(
+            "testing.jpg", message_attachment.file.read(), "image/jpeg"
         )
-        _message.attach_file.assert_called_once_with(message_attachment.file.path)
         _message.attach_alternative.assert_called_once_with(
             "good <strong>strong</strong> body here!", "text/html"
         )
@@ -89,8 +123,9 @@ class TestMailinglistDefaultHookset:
             subject="[mailinglist] subject or whatever",
             from_email="loving@it.com",
             headers={"header": "yes"},
+            connection=None,
         )
-        _message.attach_file.assert_not_called()
+        _message.attach.assert_not_called()
         _message.attach_alternative.assert_called_once_with(
             "good <strong>strong</strong> body here!", "text/html"
         )
@@ -105,7 +140,7 @@ class TestMailinglistDefaultHookset:
             body="good strong body here!",
             subject="[mailinglist] subject or whatever",
             from_email="loving@it.com",
-            attachments=[message_attachment],
+            attachments=[AttachmentPayload(message_attachment)],
             headers={"header": "yes"},
         )
         p_email_alternatives.assert_called_once_with(
@@ -114,11 +149,137 @@ class TestMailinglistDefaultHookset:
             subject="[mailinglist] subject or whatever",
             from_email="loving@it.com",
             headers={"header": "yes"},
+            connection=None,
+        )
+        _message.attach.assert_called_once_with(
+            "testing.jpg", message_attachment.file.read(), "image/jpeg"
         )
-        _message.attach_file.assert_called_once_with(message_attachment.file.path)
         _message.attach_alternative.assert_not_called()
         _message.send.assert_called_once_with()
 
+    @patch("mailinglist.hooks.EmailMultiAlternatives")
+    def test_send_message_connection(self, p_email_alternatives):
+        _message = Mock()
+        _connection = Mock()
+        p_email_alternatives.return_value = _message
+        MailinglistDefaultHookset().send_message(
+            to="someone@email.com",
+            body="good strong body here!",
+            subject="[mailinglist] subject or whatever",
+            from_email="loving@it.com",
+            connection=_connection,
+        )
+        assert p_email_alternatives.call_args.kwargs["connection"] is _connection
+        _message.send.assert_called_once_with()
+        _connection.close.assert_not_called()
+
+    @patch("mailinglist.hooks.EmailMultiAlternatives")
+    def test_send_message_reconnect(self, p_email_alternatives):
+        _message = Mock()
+        _message.send.side_effect = [SMTPServerDisconnected, 1]
+        _connection = Mock()
+        p_email_alternatives.return_value = _message
+        MailinglistDefaultHookset().send_message(
+            to="someone@email.com",
+            body="good strong body here!",
+            subject="[mailinglist] subject or whatever",
+            from_email="loving@it.com",
+            connection=_connection,
+        )
+        assert _message.send.call_count == 2
+        _connection.close.assert_called_once_with()
+        _connection.open.assert_called_once_with()
+
+    @patch("mailinglist.hooks.EmailMultiAlternatives")
+    def test_send_message_disconnect_no_connection(self, p_email_alternatives):
+        _message = Mock()
+        _message.send.side_effect = SMTPServerDisconnected
+        p_email_alternatives.return_value = _message
+        with pytest.raises(SMTPServerDisconnected):
+            MailinglistDefaultHookset().send_message(
+                to="someone@email.com",
+                body="good strong body here!",
+                subject="[mailinglist] subject or whatever",
+                from_email="loving@it.com",
+            )
+        _message.send.assert_called_once_with()
+
+    @patch("mailinglist.hooks.get_connection")
+    def test_connection(self, p_get_connection):
+        _connection = Mock()
+        p_get_connection.return_value = _connection
+        with MailinglistDefaultHookset().connection() as connection:
+            assert connection is _connection
+            _connection.open.assert_called_once_with()
+            _connection.close.assert_not_called()
+        _connection.close.assert_called_once_with()
+
+    @patch.object(MailinglistDefaultHookset, "send_message")
+    def test_send_messages(self, p_send_message):
+        p_send_message.side_effect = [None, SMTPException("boom"), None]
+        _connection = Mock()
+        results = MailinglistDefaultHookset().send_messages(
+            [{"to": ["a@email.com"]}, {"to": ["b@email.com"]}, {"to": ["c@email.com"]}],
+            connection=_connection,
+        )
+        assert results[0] is None
+        assert isinstance(results[1], SMTPException)
+        assert results[2] is None
+        p_send_message.assert_has_calls(
+            [
+                call(connection=_connection, to=["a@email.com"]),
+                call(connection=_connection, to=["b@email.com"]),
+                call(connection=_connection, to=["c@email.com"]),
+            ]
+        )
+
+    def test_send_messages_send_message_signature(self):
+        sent = []
+
+        class KeywordsHookset(MailinglistDefaultHookset):
+            def send_message(
+                self, *, to, body, subject, from_email, html_body=None, **extra
+            ):
+                sent.append(extra)
+
+        class LegacyHookset(MailinglistDefaultHookset):
+            # written before send_message took a connection
+            def send_message(self, *, to, body, subject, from_email):
+                sent.append(to)
+
+        message = {"to": ["a@email.com"], "body": "", "subject": "", "from_email": ""}
+        connection = Mock()
+        assert KeywordsHookset().send_messages([message], connection=connection) == [
+            None
+        ]
+        assert LegacyHookset().send_messages([message], connection=connection) == [
+            None
+        ]
+        assert sent == [{"connection": connection}, ["a@email.com"]]
+
+    @patch.object(MailinglistDefaultHookset, "send_message")
+    def test_send_messages_bug(self, p_send_message):
+        # not a delivery error, e.g. a hookset bug
+        p_send_message.side_effect = [None, TypeError("bug")]
+        with pytest.raises(TypeError):
+            MailinglistDefaultHookset().send_messages(
+                [{"to": ["a@email.com"]}, {"to": ["b@email.com"]}], connection=Mock()
+            )
+
+    @patch("mailinglist.hooks.get_connection")
+    @patch.object(MailinglistDefaultHookset, "send_message")
+    def test_send_messages_no_connection(self, p_send_message, p_get_connection):
+        _connection = Mock()
+        p_get_connection.return_value = _connection
+        results = MailinglistDefaultHookset().send_messages(
+            [{"to": ["a@email.com"]}, {"to": ["b@email.com"]}]
+        )
+        assert results == [None, None]
+        p_get_connection.assert_called_once_with()
+        for _call in p_send_message.call_args_list:
+            assert _call.kwargs["connection"] is _connection
+        _connection.close.assert_called_once_with()
+
     def test_message_attachment_file_validator_bad(self):
         with pytest.raises(ValidationError):
             MailinglistDefaultHookset().message_attachment_file_validator(
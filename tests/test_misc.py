@@ -5,12 +5,64 @@ from importlib import reload
 
 import pytest
 from django.core.management import call_command
+from django.test import override_settings
 
 
+@patch("mailinglist.services.OutboxService.process_outbox")
 @patch("mailinglist.services.SubmissionService.process_submissions")
-def test_process_submissions_managment_command(p_process):
+def test_process_submissions_managment_command(p_process, p_process_outbox):
     call_command("process_submissions")
     p_process.assert_called_once_with()
+    p_process_outbox.assert_called_once_with()
+
+
+@override_settings(MAILINGLIST_QUEUE_SUBMISSIONS=True)
+@patch("mailinglist.services.OutboxService.process_outbox")
+@patch("mailinglist.services.SubmissionService.process_submissions")
+def test_process_submissions_managment_command_queue(p_process, p_process_outbox):
+    call_command("process_submissions")
+    p_process.assert_called_once_with()
+    assert p_process_outbox.call_count == 2
+
+
+@pytest.mark.django_db
+@override_settings(MAILINGLIST_BATCH_SIZE=4)
+def test_benchmark_subscribers_command(capsys):
+    from mailinglist import models
+
+    call_command("benchmark_subscribers", subscriptions=20, chunk_size=8)
+    out = capsys.readouterr().out
+    # 12 subscribed, less 1 globally denied
+    assert "Counted 11 recipients" in out
+    assert "Claimed 3 chunks" in out
+    assert not models.Subscription.objects.exists()
+
+
+@pytest.mark.django_db
+def test_benchmark_subscribers_command_excludes(capsys):
+    call_command("benchmark_subscribers", subscriptions=20, excludes=20)
+    out = capsys.readouterr().out
+    assert "Excluded 20 subscriptions" in out
+    assert "Counted 0 recipients" in out
+
+
+@pytest.mark.django_db
+def test_benchmark_subscribers_command_snapshot(capsys):
+    call_command("benchmark_subscribers", subscriptions=20, snapshot=True)
+    out = capsys.readouterr().out
+    assert "Recorded 11 recipients" in out
+    assert "Counted 11 recipients" in out
+
+
+@pytest.mark.django_db
+def test_benchmark_import_command(capsys):
+    from mailinglist import models
+
+    call_command("benchmark_import", rows=20)
+    out = capsys.readouterr().out
+    assert "20 rows, 100% read" in out
+    assert "Parsed 20 addresses" in out
+    assert not models.MailingList.objects.filter(slug="benchmark").exists()
 
 
 @pytest.fixture
@@ -40,3 +92,12 @@ def test_process_submissions_celery(p_process):
     assert hasattr(tasks, "process_submissions")
     tasks.process_submissions()
     p_process.assert_called_once_with()
+
+
+@patch("mailinglist.services.OutboxService.process_outbox")
+def test_process_outbox_celery(p_process_outbox):
+    reload(sys.modules["mailinglist.tasks"])
+    from mailinglist import tasks
+
+    tasks.process_outbox()
+    p_process_outbox.assert_called_once_with()
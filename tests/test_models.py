@@ -1,5 +1,7 @@
 from unittest.mock import patch
-from mailinglist.models import hookset_validation_wrapper
+
+import pytest
+from mailinglist.models import MessagePart, hookset_validation_wrapper
 
 
 def test_subscription_string(subscription):
@@ -16,6 +18,52 @@ def test_message_part_html(message_part):
     assert "<strong>exquisite</strong>" in message_part.html_text
 
 
+def test_message_part_html_stored(message_part):
+    assert "<em>verbosely</em>" in message_part.html
+    message_part = MessagePart.objects.get(pk=message_part.pk)
+    with patch("mailinglist.models.markdown") as p_markdown:
+        assert "<em>verbosely</em>" in message_part.html_text
+    p_markdown.assert_not_called()
+
+
+def test_message_part_html_refreshed(message_part):
+    message_part.text = "*changed*"
+    message_part.save(update_fields=["text"])
+    message_part.refresh_from_db()
+    assert message_part.html == "<p><em>changed</em></p>"
+    assert message_part.html_text == "<p><em>changed</em></p>"
+
+
+def test_message_part_html_changed(message_part):
+    message_part = MessagePart.objects.get(pk=message_part.pk)
+    message_part.text = "*brand new*"
+    assert message_part.html_text == "<p><em>brand new</em></p>"
+
+
+def test_message_part_html_unsaved(message_part):
+    message_part.html = ""
+    assert "<em>verbosely</em>" in message_part.html_text
+
+
+@pytest.mark.parametrize(
+    "defer, only",
+    [(("html",), ()), (("text",), ()), ((), ("heading",))],
+)
+def test_message_part_deferred(message_part, defer, only):
+    queryset = MessagePart.objects.defer(*defer)
+    if only:
+        queryset = queryset.only(*only)
+    deferred = queryset.get(pk=message_part.pk)
+    with patch("mailinglist.models.markdown") as p_markdown:
+        deferred.heading = "changed"
+        deferred.save()
+        assert "<em>verbosely</em>" in deferred.html_text
+    p_markdown.assert_not_called()
+    deferred.refresh_from_db()
+    assert deferred.heading == "changed"
+    assert "<em>verbosely</em>" in deferred.html
+
+
 def test_submission_string(submission):
     assert (
         str(submission) == f"{submission.message} to {submission.message.mailing_list}"
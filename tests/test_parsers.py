@@ -1,9 +1,9 @@
-from unittest.mock import patch, call
+from unittest.mock import Mock, patch, call
 from django.core.exceptions import ValidationError
 import pytest
 import io
 
-from mailinglist.addressimport.parsers import AddressList, parse_csv
+from mailinglist.addressimport.parsers import AddressList, FieldLimits, parse_csv
 
 
 @pytest.fixture
@@ -130,12 +130,13 @@ class TestAddressList:
             )
 
     def test_add_duplicate_subscription(self, address_list, subscription):
+        address_list.add(
+            email=subscription.user.email,
+            first_name="Test",
+            last_name=None,
+        )
         with pytest.raises(ValidationError):
-            address_list.add(
-                email=subscription.user.email,
-                first_name="Test",
-                last_name=None,
-            )
+            address_list.flush()
 
     def test_add_duplicate_subscription_quiet(self, address_list_quiet, subscription):
         address_list_quiet.add(
@@ -143,8 +144,56 @@ class TestAddressList:
             first_name="Test",
             last_name=None,
         )
+        address_list_quiet.flush()
         assert subscription.user.email not in address_list_quiet.addresses
 
+    def test_add_duplicate_subscription_case(self, address_list_quiet, subscription):
+        email = subscription.user.email.upper()
+        address_list_quiet.add(email=email, first_name="Test", last_name=None)
+        address_list_quiet.flush()
+        assert email not in address_list_quiet.addresses
+
+    def test_add_chunked(self, mailing_list, subscription, django_assert_num_queries):
+        address_list = AddressList(
+            mailing_list=mailing_list, ignore_errors=True, chunk_size=2
+        )
+        emails = [f"new{i}@email.com" for i in range(3)] + [subscription.user.email]
+        # one query per chunk of two addresses
+        with django_assert_num_queries(2):
+            for email in emails:
+                address_list.add(email=email, first_name="Test", last_name=None)
+        with django_assert_num_queries(0):
+            address_list.flush()
+        assert list(address_list.addresses) == emails[:3]
+
+
+class TestFieldLimits:
+    def test_check(self):
+        field_limits = FieldLimits()
+        assert field_limits.check(field_name="first_name", value=" Test ") == "Test"
+        assert field_limits.check(field_name="first_name", value=None) is None
+
+    def test_check_overlong(self):
+        field_limits = FieldLimits()
+        with pytest.raises(ValidationError):
+            field_limits.check(field_name="first_name", value="m" * 300)
+        value = field_limits.check(
+            field_name="first_name", value="m" * 300, ignore_errors=True
+        )
+        assert len(value) == field_limits.get_max_length("first_name")
+
+    def test_max_length_cached(self):
+        field_limits = FieldLimits()
+        with patch.object(
+            field_limits.user_model._meta,
+            "get_field",
+            wraps=field_limits.user_model._meta.get_field,
+        ) as p_get_field:
+            for _ in range(3):
+                field_limits.check(field_name="first_name", value="Test")
+                field_limits.check(field_name="last_name", value="Test")
+        assert p_get_field.call_count == 2
+
 
 class TestParseCsv:
     @patch.object(AddressList, "add")
@@ -171,3 +220,57 @@ another,human,identity@real.yes"""
                 ),
             ]
         )
+
+    @patch.object(AddressList, "add")
+    def test_parse_bom(self, p_add, mailing_list):
+        _file = io.BytesIO(b"\xef\xbb\xbfemail,first_name\r\nperson@person.us,test\r\n")
+        parse_csv(_file, mailing_list)
+        p_add.assert_called_once_with(
+            email="person@person.us", first_name="test", location="line 0"
+        )
+        assert not _file.closed
+
+    @patch.object(AddressList, "add")
+    def test_parse_encoding(self, p_add, mailing_list):
+        _file = io.BytesIO("email,first_name\nperson@person.us,Zoë\n".encode("cp1252"))
+        parse_csv(_file, mailing_list, encoding="cp1252")
+        p_add.assert_called_once_with(
+            email="person@person.us", first_name="Zoë", location="line 0"
+        )
+
+    @patch.object(AddressList, "add")
+    def test_parse_quoted_newline(self, p_add, mailing_list):
+        _file = io.BytesIO(b'email,last_name\nperson@person.us,"two\nlines"\n')
+        parse_csv(_file, mailing_list)
+        p_add.assert_called_once_with(
+            email="person@person.us", last_name="two\nlines", location="line 0"
+        )
+
+    @patch.object(AddressList, "add")
+    def test_parse_bad_encoding(self, p_add, mailing_list):
+        _file = io.BytesIO("email,first_name\nperson@person.us,Zoë\n".encode("cp1252"))
+        with pytest.raises(ValidationError):
+            parse_csv(_file, mailing_list)
+
+    @patch.object(AddressList, "add")
+    def test_parse_progress(self, p_add, mailing_list):
+        content = b"email\n" + b"".join(b"p%d@person.us\n" % i for i in range(5))
+        progress = Mock()
+        parse_csv(
+            io.BytesIO(content), mailing_list, progress=progress, progress_interval=2
+        )
+        assert progress.call_args_list == [
+            call(rows=2, bytes_read=len(content)),
+            call(rows=4, bytes_read=len(content)),
+            call(rows=5, bytes_read=len(content)),
+        ]
+
+    def test_parse_existing_subscription(self, mailing_list, subscription):
+        _file = io.BytesIO(
+            b"email,first_name,last_name\n"
+            b"new@person.us,New,Person\n"
+            + subscription.user.email.encode()
+            + b",Old,Person\n"
+        )
+        addresses = parse_csv(_file, mailing_list, ignore_errors=True)
+        assert list(addresses) == ["new@person.us"]
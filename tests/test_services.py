@@ -1,14 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
-from unittest.mock import Mock, patch, call
+from smtplib import SMTPException
+from unittest.mock import MagicMock, Mock, PropertyMock, patch, call
 
 import pytest
 from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models.fields.files import FieldFile
+from django.template import engines
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.timezone import now
 
 from mailinglist import models, services
-from mailinglist.enum import SubmissionStatusEnum, SubscriptionStatusEnum
+from mailinglist.hooks import MailinglistDefaultHookset
+from mailinglist.enum import (
+    SendingFailureStatusEnum,
+    SubmissionStatusEnum,
+    SubscriptionStatusEnum,
+)
 
 
 class TestTemplateSet:
@@ -32,6 +43,27 @@ class TestTemplateSet:
             ]
         )
 
+    @patch("mailinglist.services.select_template")
+    def test_get_template_cached(self, p_select_template, mailing_list):
+        ts = services.TemplateSet(mailing_list=mailing_list)
+        template = ts._get_template()
+        assert services.TemplateSet(mailing_list=mailing_list)._get_template() is (
+            template
+        )
+        p_select_template.assert_called_once()
+        ts._get_template(suffix="html")
+        assert p_select_template.call_count == 2
+
+    @patch("mailinglist.services.select_template")
+    def test_get_template_cache_cleared(self, p_select_template, mailing_list):
+        services.TemplateSet(mailing_list=mailing_list)._get_template()
+        services.TemplateSet(mailing_list=None)._get_template()
+        mailing_list.send_html = False
+        mailing_list.save()
+        services.TemplateSet(mailing_list=mailing_list)._get_template()
+        services.TemplateSet(mailing_list=None)._get_template()
+        assert p_select_template.call_count == 3
+
     @patch("mailinglist.services.select_template")
     def test_get_template_suffix(self, p_select_template, mailing_list):
         services.TemplateSet(mailing_list=mailing_list)._get_template(suffix="html")
@@ -145,6 +177,94 @@ class TestTemplateSet:
         assert ctx["DEFAULT_SENDER_NAME"] == "Good Name"
 
 
+class TestSubmissionTemplateSet:
+    def test_render_to_dict_matches_full_render(
+        self, message, message_part, subscription_factory
+    ):
+        ts = services.SubmissionTemplateSet(message=message)
+        for subscription in [subscription_factory(), subscription_factory()]:
+            context = {"subscription": subscription, "message": message}
+            expected = services.TemplateSet(
+                mailing_list=message.mailing_list
+            ).render_to_dict(context)
+            rendered = ts.render_to_dict(context)
+            assert rendered == expected
+            assert subscription.token in rendered["body"]
+            assert services.PLACEHOLDER_TOKEN not in rendered["html_body"]
+
+    @patch.object(models.MessagePart, "html_text", new_callable=PropertyMock)
+    def test_render_to_dict_renders_once(
+        self, p_html_text, message, message_part, subscription_factory
+    ):
+        p_html_text.return_value = "<p>rendered</p>"
+        ts = services.SubmissionTemplateSet(message=message)
+        for _ in range(3):
+            ts.render_to_dict(
+                {"subscription": subscription_factory(), "message": message}
+            )
+        # once with each placeholder
+        assert p_html_text.call_count == 2
+
+    def test_render_to_dict_personalized(self, message, subscription):
+        ts = services.SubmissionTemplateSet(message=message)
+        ts._templates = {
+            "body": engines["django"].from_string(
+                "Hi {{ subscription.user.first_name }} {{ subscription.token }}"
+            )
+        }
+        rendered = ts.render_to_dict({"subscription": subscription, "message": message})
+        assert ts._personalized
+        assert rendered["body"] == (
+            f"Hi {subscription.user.first_name} {subscription.token}"
+        )
+
+    @pytest.mark.parametrize(
+        "template",
+        [
+            "{{ subscription.token|length }}",
+            "{{ subscription.token|upper }}",
+            "{{ subscription.token|slice:':5' }}",
+            "{{ subscription.token|urlencode }}-{{ subscription.token|cut:'a' }}",
+        ],
+    )
+    def test_render_to_dict_filtered_token(self, template, message, subscription):
+        ts = services.SubmissionTemplateSet(message=message)
+        ts._templates = {"body": engines["django"].from_string(template)}
+        rendered = ts.render_to_dict({"subscription": subscription, "message": message})
+        expected = (
+            engines["django"]
+            .from_string(template)
+            .render({"subscription": subscription})
+        )
+        assert ts._personalized
+        assert rendered["body"] == expected
+
+    def test_render_to_dict_filter_independent_of_token(self, message, subscription):
+        ts = services.SubmissionTemplateSet(message=message)
+        ts._templates = {
+            "body": engines["django"].from_string(
+                "{{ subscription.token|yesno:'has,no' }} {{ subscription.token }}"
+            )
+        }
+        rendered = ts.render_to_dict({"subscription": subscription, "message": message})
+        assert not ts._personalized
+        assert rendered["body"] == f"has {subscription.token}"
+
+    @patch.object(services.TemplateSet, "render_to_dict")
+    def test_render_to_dict_other_message(self, p_render, message):
+        ts = services.SubmissionTemplateSet(message=message)
+        context = {"subscription": Mock(), "message": Mock()}
+        ts.render_to_dict(context)
+        p_render.assert_called_once_with(context)
+
+    @patch.object(services.TemplateSet, "render_to_dict")
+    def test_render_to_dict_no_subscription(self, p_render, message):
+        ts = services.SubmissionTemplateSet(message=message)
+        context = {"subscription": None, "message": message}
+        ts.render_to_dict(context)
+        p_render.assert_called_once_with(context)
+
+
 class TestMessageService:
     @patch.object(
         services.MessageService, "_headers", return_value={"important-header": True}
@@ -205,6 +325,26 @@ class TestMessageService:
         ):
             assert subscription.token in ret[key]
         assert subscription.mailing_list.slug in ret["List-Archive"]
+        assert ret["List-Unsubscribe-Post"] == "List-Unsubscribe=One-Click"
+        assert services.PLACEHOLDER_TOKEN not in "".join(ret.values())
+
+    def test_headers_built_once(self, mailing_list, subscription_factory):
+        subscriptions = [subscription_factory() for _ in range(2)]
+        message_service = services.MessageService()
+        with patch("mailinglist.services.reverse", wraps=reverse) as p_reverse:
+            rets = [
+                message_service._headers(subscription=subscription)
+                for subscription in subscriptions
+            ]
+        assert p_reverse.call_count == 4
+        for subscription, ret in zip(subscriptions, rets):
+            assert subscription.token in ret["List-Unsubscribe"]
+            assert (
+                ret["List-Unsubscribe"]
+                == services.MessageService()._headers(subscription=subscription)[
+                    "List-Unsubscribe"
+                ]
+            )
 
     def test_headers_no_mailing_list(self, subscription):
         subscription.mailing_list = None
@@ -249,6 +389,209 @@ class TestMessageService:
         assert ret == "generic return"
 
 
+class TestAttachmentPayload:
+    def test_content(self, message_attachment, fake_image):
+        payload = services.AttachmentPayload(message_attachment)
+        assert payload.filename == "testing.jpg"
+        assert payload.mimetype == "image/jpeg"
+        fake_image.seek(0)
+        with patch.object(payload, "_read") as p_read:
+            assert payload.content == fake_image.read()
+            p_read.assert_not_called()
+
+    def test_content_uncached(self, message_attachment, fake_image):
+        payload = services.AttachmentPayload(message_attachment, cache=False)
+        assert payload._content is None
+        fake_image.seek(0)
+        assert payload.content == fake_image.read()
+        assert payload.content == payload.content
+
+    def test_file(self, message_attachment):
+        payload = services.AttachmentPayload(message_attachment, cache=False)
+        assert payload.file == message_attachment.file
+        assert payload.file.path == message_attachment.file.path
+
+    def test_content_no_path(self, message_attachment, fake_image):
+        # storages which are not on the local filesystem have no ``path``
+        with patch.object(FieldFile, "path", new_callable=PropertyMock) as p_path:
+            p_path.side_effect = NotImplementedError
+            payload = services.AttachmentPayload(message_attachment)
+        fake_image.seek(0)
+        assert payload.content == fake_image.read()
+
+
+class TestRateLimiter:
+    @patch("mailinglist.services.time")
+    def test_acquire_burst(self, p_time):
+        p_time.monotonic.return_value = 100.0
+        rate_limiter = services.RateLimiter(rate=2, burst=3)
+        rate_limiter.acquire(3)
+        p_time.sleep.assert_not_called()
+
+    @patch("mailinglist.services.time")
+    def test_acquire_waits(self, p_time):
+        p_time.monotonic.return_value = 100.0
+        rate_limiter = services.RateLimiter(rate=2, burst=1)
+        rate_limiter.acquire()
+        rate_limiter.acquire()
+        p_time.sleep.assert_called_once_with(0.5)
+        rate_limiter.acquire(2)
+        p_time.sleep.assert_called_with(1.5)
+
+    @patch("mailinglist.services.time")
+    def test_acquire_credits_elapsed_time(self, p_time):
+        p_time.monotonic.return_value = 100.0
+        rate_limiter = services.RateLimiter(rate=2, burst=4)
+        rate_limiter.acquire(4)
+        # time spent rendering/sending counts against the wait
+        p_time.monotonic.return_value = 101.5
+        rate_limiter.acquire(4)
+        p_time.sleep.assert_called_once_with(0.5)
+
+    @patch("mailinglist.services.time")
+    def test_acquire_burst_cap(self, p_time):
+        p_time.monotonic.return_value = 100.0
+        rate_limiter = services.RateLimiter(rate=2, burst=2)
+        rate_limiter.acquire(2)
+        p_time.monotonic.return_value = 1000.0
+        rate_limiter.acquire(3)
+        p_time.sleep.assert_called_once_with(0.5)
+
+    @patch("mailinglist.services.time")
+    def test_acquire_unlimited(self, p_time):
+        p_time.monotonic.return_value = 100.0
+        rate_limiter = services.RateLimiter(rate=None)
+        rate_limiter.acquire(1000)
+        p_time.sleep.assert_not_called()
+
+    @patch("mailinglist.services.time")
+    def test_bursts(self, p_time):
+        p_time.monotonic.return_value = 100.0
+        rate_limiter = services.RateLimiter(rate=100, burst=2)
+        sleeps = []
+        p_time.sleep.side_effect = sleeps.append
+        bursts = []
+        for burst in rate_limiter.bursts(list(range(5))):
+            # each burst waits for its own tokens only
+            bursts.append((burst, len(sleeps)))
+        assert bursts == [([0, 1], 0), ([2, 3], 1), ([4], 2)]
+        assert sleeps == pytest.approx([0.02, 0.03])
+
+    def test_bursts_unlimited(self):
+        rate_limiter = services.RateLimiter(rate=None, burst=1)
+        assert list(rate_limiter.bursts([0, 1, 2])) == [[0, 1, 2]]
+        assert list(rate_limiter.bursts([])) == []
+
+    @patch("mailinglist.services.time")
+    def test_current_rate(self, p_time):
+        p_time.monotonic.return_value = 100.0
+        rate_limiter = services.RateLimiter(rate=None, window=10)
+        rate_limiter.acquire(20)
+        p_time.monotonic.return_value = 105.0
+        rate_limiter.acquire(30)
+        assert rate_limiter.current_rate == 5
+        p_time.monotonic.return_value = 112.0
+        assert rate_limiter.current_rate == 3
+
+    def test_acquire_threads(self):
+        rate_limiter = services.RateLimiter(rate=1000, burst=1)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda _: rate_limiter.acquire(), range(40)))
+        assert rate_limiter._tokens <= 1
+
+
+class TestSharedRateLimiter:
+    @patch("mailinglist.services.time")
+    def test_acquire(self, p_time, db):
+        p_time.monotonic.return_value = 100.0
+        rate_limiter = services.SharedRateLimiter(rate=10, burst=5)
+        with patch("mailinglist.services.timezone.now") as p_now:
+            p_now.return_value = now()
+            rate_limiter.acquire(5)
+            p_time.sleep.assert_not_called()
+            # another process shares the bucket
+            services.SharedRateLimiter(rate=10, burst=5).acquire(2)
+            p_time.sleep.assert_called_once_with(pytest.approx(0.2))
+        bucket = models.RateLimitBucket.objects.get(name="default")
+        assert bucket.tokens == pytest.approx(-2)
+
+    @patch("mailinglist.services.time")
+    def test_acquire_refills(self, p_time, db):
+        p_time.monotonic.return_value = 100.0
+        rate_limiter = services.SharedRateLimiter(rate=10, burst=5)
+        with patch("mailinglist.services.timezone.now") as p_now:
+            start = now()
+            p_now.return_value = start
+            rate_limiter.acquire(5)
+            p_now.return_value = start + timedelta(seconds=0.3)
+            rate_limiter.acquire(3)
+        p_time.sleep.assert_not_called()
+        assert models.RateLimitBucket.objects.get(name="default").tokens == 0
+
+    @patch("mailinglist.services.time")
+    def test_acquire_unlimited(self, p_time, db):
+        p_time.monotonic.return_value = 100.0
+        services.SharedRateLimiter(rate=None).acquire(1000)
+        p_time.sleep.assert_not_called()
+        assert not models.RateLimitBucket.objects.exists()
+
+
+class TestSendingLog:
+    def test_loads_previous_sendings(self, active_subscription, submission):
+        models.Sending.objects.create(
+            submission=submission, subscription=active_subscription
+        )
+        assert active_subscription in services.SendingLog(submission)
+        models.Sending.objects.filter(submission=submission).delete()
+
+    def test_add_batches(self, subscription_factory, submission):
+        subscriptions = [subscription_factory() for _ in range(3)]
+        sending_log = services.SendingLog(submission, batch_size=2)
+        sending_log.add(subscriptions[0])
+        assert not models.Sending.objects.filter(submission=submission).exists()
+        sending_log.add(subscriptions[1])
+        assert models.Sending.objects.filter(submission=submission).count() == 2
+        sending_log.add(subscriptions[2])
+        assert all(s in sending_log for s in subscriptions)
+        assert models.Sending.objects.filter(submission=submission).count() == 2
+        sending_log.flush()
+        assert models.Sending.objects.filter(submission=submission).count() == 3
+        models.Sending.objects.filter(submission=submission).delete()
+
+    def test_query_count(
+        self, subscription_factory, submission, django_assert_num_queries
+    ):
+        subscriptions = [subscription_factory() for _ in range(5)]
+        with django_assert_num_queries(2):
+            sending_log = services.SendingLog(submission)
+            for subscription in subscriptions:
+                assert subscription not in sending_log
+                sending_log.add(subscription)
+            sending_log.flush()
+        models.Sending.objects.filter(submission=submission).delete()
+
+    def test_flush_recorded_elsewhere(self, active_subscription, submission):
+        sending_log = services.SendingLog(submission)
+        sending_log.add(active_subscription)
+        # recorded by another process in the meantime
+        models.Sending.objects.create(
+            submission=submission, subscription=active_subscription
+        )
+        sending_log.flush()
+        assert models.Sending.objects.filter(submission=submission).count() == 1
+        models.Sending.objects.filter(submission=submission).delete()
+
+    def test_unique(self, active_subscription, submission):
+        models.Sending.objects.create(
+            submission=submission, subscription=active_subscription
+        )
+        with pytest.raises(IntegrityError), transaction.atomic():
+            models.Sending.objects.create(
+                submission=submission, subscription=active_subscription
+            )
+        models.Sending.objects.filter(submission=submission).delete()
+
+
 class TestSubmissionService:
     def test_get_included_subscribers(self, active_subscription, submission):
         subscriptions = services.SubmissionService()._get_included_subscribers(
@@ -271,93 +614,470 @@ class TestSubmissionService:
         )
         assert active_denied_subscription not in subscriptions
 
+    def test_get_included_subscribers_anti_join(self, subscription_factory, submission):
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(4)
+        ]
+        submission.exclude.add(*subscriptions[:2])
+        models.GlobalDeny.objects.create(user=subscriptions[2].user)
+        included = services.SubmissionService()._get_included_subscribers(submission)
+        assert list(included.order_by("pk")) == subscriptions[3:]
+        sql = str(included.query).upper()
+        assert "NOT IN" not in sql
+        assert sql.count("NOT EXISTS") == 2
+
     @override_settings(
-        MAILINGLIST_EMAIL_DELAY=2,
         MAILINGLIST_BATCH_SIZE=200,
         MAILINGLIST_BATCH_DELAY=3,
     )
     @patch("time.sleep")
-    def test_rate_limit(self, p_sleep):
-        services.SubmissionService()._rate_limit(99)
-        p_sleep.assert_called_once_with(2)
+    def test_batch_delay(self, p_sleep):
+        services.SubmissionService()._batch_delay(150, 199)
+        p_sleep.assert_not_called()
 
     @override_settings(
-        MAILINGLIST_EMAIL_DELAY=2,
         MAILINGLIST_BATCH_SIZE=200,
         MAILINGLIST_BATCH_DELAY=3,
     )
     @patch("time.sleep")
-    def test_rate_limit_batch(self, p_sleep):
-        services.SubmissionService()._rate_limit(400)
+    def test_batch_delay_batch(self, p_sleep):
+        services.SubmissionService()._batch_delay(350, 400)
         p_sleep.assert_called_once_with(3)
 
     @override_settings(
-        MAILINGLIST_EMAIL_DELAY=2,
         MAILINGLIST_BATCH_SIZE=200,
         MAILINGLIST_BATCH_DELAY=None,
     )
     @patch("time.sleep")
-    def test_rate_limit_batch_no_delay(self, p_sleep):
-        services.SubmissionService()._rate_limit(400)
-        p_sleep.assert_called_once_with(2)
+    def test_batch_delay_no_delay(self, p_sleep):
+        services.SubmissionService()._batch_delay(350, 400)
+        p_sleep.assert_not_called()
 
     @override_settings(
-        MAILINGLIST_EMAIL_DELAY=None,
+        MAILINGLIST_SEND_RATE=None,
+        MAILINGLIST_EMAIL_DELAY=0.5,
+        MAILINGLIST_SEND_BURST=None,
         MAILINGLIST_BATCH_SIZE=200,
-        MAILINGLIST_BATCH_DELAY=None,
     )
-    @patch("time.sleep")
-    def test_rate_limit_no_delay(self, p_sleep):
-        services.SubmissionService()._rate_limit(400)
-        p_sleep.assert_not_called()
+    def test_rate_limiter_from_email_delay(self):
+        rate_limiter = services.SubmissionService().rate_limiter
+        assert rate_limiter.rate == 2
+        assert rate_limiter.burst == 200
 
-    @patch.object(services.SubmissionService, "_send_message")
-    def test_ensure_sent(self, p_send_message, active_subscription, submission):
-        assert not models.Sending.objects.filter(
-            submission=submission, subscription=active_subscription
-        ).exists()
-        did_send = services.SubmissionService()._ensure_sent(
-            subscription=active_subscription, submission=submission
+    @override_settings(
+        MAILINGLIST_SEND_RATE=25,
+        MAILINGLIST_EMAIL_DELAY=0.5,
+        MAILINGLIST_SEND_BURST=5,
+    )
+    def test_rate_limiter(self):
+        rate_limiter = services.SubmissionService().rate_limiter
+        assert rate_limiter.rate == 25
+        assert rate_limiter.burst == 5
+
+    @override_settings(MAILINGLIST_SEND_RATE=None, MAILINGLIST_EMAIL_DELAY=None)
+    def test_rate_limiter_unlimited(self):
+        assert services.SubmissionService().rate_limiter.rate is None
+
+    @override_settings(MAILINGLIST_SHARED_RATE_LIMIT=True, MAILINGLIST_SEND_RATE=5)
+    def test_rate_limiter_shared(self):
+        rate_limiter = services.SubmissionService().rate_limiter
+        assert isinstance(rate_limiter, services.SharedRateLimiter)
+        assert rate_limiter.rate == 5
+
+    @patch.object(services.hookset, "send_messages")
+    def test_send_shard(self, p_send_messages):
+        p_send_messages.return_value = [None, None]
+        ret = services.SubmissionService()._send_shard([1, 2], connection="conn")
+        p_send_messages.assert_called_once_with([1, 2], connection="conn")
+        assert ret == [None, None]
+
+    @patch.object(services.RateLimiter, "acquire")
+    @patch.object(services.hookset, "send_messages")
+    def test_deliver(self, p_send_messages, p_acquire):
+        p_send_messages.return_value = [None, None]
+        ret = services.SubmissionService()._deliver([1, 2], connections=["conn"])
+        p_acquire.assert_called_once_with(2)
+        p_send_messages.assert_called_once_with([1, 2], connection="conn")
+        assert ret == [None, None]
+
+    def test_claim_subscribers(self, subscription_factory, submission):
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(3)
+        ]
+        models.Sending.objects.create(
+            submission=submission, subscription=subscriptions[0]
+        )
+        with transaction.atomic():
+            claimed, last_pk = services.SubmissionService()._claim_subscribers(
+                submission
+            )
+        assert claimed == subscriptions[1:]
+        assert last_pk == subscriptions[2].pk
+        models.Sending.objects.filter(submission=submission).delete()
+
+    def test_claim_subscribers_after(self, subscription_factory, submission):
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(3)
+        ]
+        with transaction.atomic():
+            claimed, _ = services.SubmissionService()._claim_subscribers(
+                submission, after=subscriptions[0].pk
+            )
+        assert claimed == subscriptions[1:]
+
+    def test_claim_subscribers_select_related(
+        self, subscription_factory, submission, django_assert_num_queries
+    ):
+        subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+        with transaction.atomic():
+            (claimed,), _ = services.SubmissionService()._claim_subscribers(
+                submission
+            )
+        with django_assert_num_queries(0):
+            claimed.token
+            claimed.user.email
+            claimed.mailing_list.sender_tag
+        assert claimed.mailing_list is submission.message.mailing_list
+        assert "first_name" in claimed.user.get_deferred_fields()
+
+    @override_settings(MAILINGLIST_SEND_FIELDS=("user__first_name",))
+    def test_claim_subscribers_send_fields(
+        self, subscription_factory, submission, django_assert_num_queries
+    ):
+        subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+        with transaction.atomic():
+            (claimed,), _ = services.SubmissionService()._claim_subscribers(
+                submission
+            )
+        with django_assert_num_queries(0):
+            claimed.user.first_name
+
+    @override_settings(MAILINGLIST_BATCH_SIZE=2)
+    def test_claim_subscribers_batch_size(self, subscription_factory, submission):
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(3)
+        ]
+        with transaction.atomic():
+            claimed, last_pk = services.SubmissionService()._claim_subscribers(
+                submission
+            )
+        assert claimed == subscriptions[:2]
+        assert last_pk == subscriptions[1].pk
+
+    @override_settings(MAILINGLIST_CLAIM_TIMEOUT=600)
+    def test_claim_subscribers_claims(self, subscription_factory, submission):
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(2)
+        ]
+        service = services.SubmissionService()
+        service._take_snapshot(submission)
+        start = now()
+        assert service._claim_subscribers(submission) == (
+            subscriptions,
+            subscriptions[1].pk,
         )
-        p_send_message.assert_called_once_with(
-            message=submission.message, subscription=active_subscription
+        recipients = models.Recipient.objects.filter(submission=submission)
+        assert all(
+            r.claimed_until >= start + timedelta(seconds=600) for r in recipients
+        )
+        # passed over by other processes until the claim expires
+        assert service._claim_subscribers(submission) == ([], None)
+        recipients.update(claimed_until=now() - timedelta(seconds=1))
+        assert service._claim_subscribers(submission)[0] == subscriptions
+
+    def _claimed_before_lock(self, service, subscriptions):
+        # another process claims the first subscribers after the query began,
+        # so the query still finds them
+        def _get_claimable_subscribers(submission, *, after=0, retry=False):
+            return models.Subscription.objects.filter(
+                pk__in=[s.pk for s in subscriptions], pk__gt=after
+            ).order_by("pk")
+
+        return patch.object(
+            service, "_get_claimable_subscribers", _get_claimable_subscribers
         )
-        assert models.Sending.objects.filter(
-            submission=submission, subscription=active_subscription
-        ).exists()
-        assert did_send
-        models.Sending.objects.filter(
-            submission=submission, subscription=active_subscription
-        ).delete()
 
-    @patch.object(services.SubmissionService, "_send_message")
-    def test_ensure_sent_already_sent(
-        self, p_send_message, active_subscription, submission
+    def test_claim_subscribers_claimed_before_lock(
+        self, subscription_factory, submission
     ):
-        models.Sending.objects.create(
-            submission=submission, subscription=active_subscription
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(2)
+        ]
+        service = services.SubmissionService()
+        service._take_snapshot(submission)
+        models.Recipient.objects.filter(subscription=subscriptions[0]).update(
+            claimed_until=now() + timedelta(seconds=60)
         )
-        did_send = services.SubmissionService()._ensure_sent(
-            subscription=active_subscription, submission=submission
+        with self._claimed_before_lock(service, subscriptions):
+            assert service._claim_subscribers(submission) == (
+                subscriptions[1:],
+                subscriptions[1].pk,
+            )
+
+    @override_settings(MAILINGLIST_BATCH_SIZE=1)
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch.object(services.hookset, "send_messages")
+    def test_process_submission_chunk_claimed_before_lock(
+        self, p_send_messages, p_batch_delay, subscription_factory, submission
+    ):
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(2)
+        ]
+        service = services.SubmissionService()
+        service._take_snapshot(submission)
+        # the whole first chunk was claimed elsewhere
+        models.Recipient.objects.filter(subscription=subscriptions[0]).update(
+            claimed_until=now() + timedelta(seconds=60)
+        )
+        p_send_messages.side_effect = lambda messages, **kwargs: [None] * len(messages)
+        submission.status = SubmissionStatusEnum.PENDING
+        submission.save()
+        with self._claimed_before_lock(service, subscriptions):
+            assert service._claim_subscribers(submission) == ([], subscriptions[0].pk)
+            assert service.process_submission(submission) == 1
+        messages = p_send_messages.call_args.args[0]
+        assert [m["to"] for m in messages] == [[subscriptions[1].user.email]]
+        models.Sending.objects.filter(submission=submission).delete()
+
+    def test_load_attachments(self, message, message_attachment):
+        payloads = services.SubmissionService()._load_attachments(message)
+        assert [p.attachment for p in payloads] == [message_attachment]
+        assert payloads[0]._content is not None
+
+    @override_settings(MAILINGLIST_ATTACHMENT_CACHE_SIZE=1)
+    def test_load_attachments_over_budget(self, message, message_attachment):
+        payloads = services.SubmissionService()._load_attachments(message)
+        assert [p.attachment for p in payloads] == [message_attachment]
+        assert payloads[0]._content is None
+
+    @patch.object(services.hookset, "send_messages")
+    def test_send_batch(self, p_send_messages, subscription_factory, submission):
+        subscriptions = [subscription_factory() for _ in range(2)]
+        p_send_messages.return_value = [None, None]
+        sending_log = services.SendingLog(submission)
+        sent = services.SubmissionService()._send_batch(
+            [(s, {"to": [s.user.email]}) for s in subscriptions],
+            sending_log=sending_log,
+            connections=Mock(**{"open.return_value": ["connection"]}),
+        )
+        p_send_messages.assert_called_once_with(
+            [{"to": [s.user.email]} for s in subscriptions], connection="connection"
+        )
+        assert sent == subscriptions
+        assert not models.SendingFailure.objects.exists()
+        sendings = models.Sending.objects.filter(submission=submission)
+        assert {s.subscription_id for s in sendings} == {s.pk for s in subscriptions}
+        sendings.delete()
+
+    @patch.object(services.hookset, "send_messages")
+    def test_deliver_sharded(self, p_send_messages):
+        p_send_messages.side_effect = lambda messages, connection: [
+            f"{connection}-{m}" for m in messages
+        ]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = services.SubmissionService()._deliver(
+                [0, 1, 2, 3, 4], connections=["a", "b"], executor=executor
+            )
+        assert results == ["a-0", "b-1", "a-2", "b-3", "a-4"]
+        p_send_messages.assert_has_calls(
+            [call([0, 2, 4], connection="a"), call([1, 3], connection="b")],
+            any_order=True,
         )
-        p_send_message.assert_not_called()
-        assert not did_send
-        models.Sending.objects.filter(
-            submission=submission, subscription=active_subscription
-        ).delete()
 
-    @patch.object(services.SubmissionService, "_send_message")
-    def test_ensure_sent_send_failure(
-        self, p_send_message, active_subscription, submission
+    @patch.object(services.hookset, "send_messages")
+    def test_deliver_sharded_small_batch(self, p_send_messages):
+        p_send_messages.side_effect = lambda messages, connection: [None] * len(
+            messages
+        )
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            results = services.SubmissionService()._deliver(
+                [0], connections=["a", "b", "c"], executor=executor
+            )
+        assert results == [None]
+        p_send_messages.assert_called_once_with([0], connection="a")
+
+    @patch.object(services.hookset, "send_messages")
+    def test_deliver_sharded_shard_raises(self, p_send_messages):
+        error = SMTPException("boom")
+
+        def _send_messages(messages, connection):
+            if connection == "b":
+                raise error
+            return [None] * len(messages)
+
+        p_send_messages.side_effect = _send_messages
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = services.SubmissionService()._deliver(
+                [0, 1, 2, 3], connections=["a", "b"], executor=executor
+            )
+        assert results == [None, error, None, error]
+
+    @override_settings(MAILINGLIST_SEND_RATE=1000, MAILINGLIST_SEND_BURST=2)
+    @patch.object(services.hookset, "send_messages")
+    def test_deliver_bursts(self, p_send_messages):
+        p_send_messages.side_effect = lambda messages, **kwargs: [None] * len(messages)
+        results = services.SubmissionService()._deliver(
+            [0, 1, 2, 3, 4], connections=["conn"]
+        )
+        assert results == [None] * 5
+        assert [c.args[0] for c in p_send_messages.call_args_list] == [
+            [0, 1],
+            [2, 3],
+            [4],
+        ]
+
+    @patch.object(services.hookset, "send_messages")
+    def test_deliver_sharded_shard_bug(self, p_send_messages):
+        p_send_messages.side_effect = TypeError("bug")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            with pytest.raises(TypeError):
+                services.SubmissionService()._deliver(
+                    [0, 1], connections=["a", "b"], executor=executor
+                )
+
+    @patch.object(services.hookset, "send_messages")
+    def test_send_batch_failure(
+        self, p_send_messages, subscription_factory, submission
     ):
-        p_send_message.side_effect = Exception("boom")
-        with pytest.raises(Exception):
-            services.SubmissionService()._ensure_sent(
-                subscription=active_subscription, submission=submission
+        subscriptions = [subscription_factory() for _ in range(3)]
+        p_send_messages.return_value = [None, ValueError("boom"), None]
+        sending_log = services.SendingLog(submission)
+        sent = services.SubmissionService()._send_batch(
+            [(s, {}) for s in subscriptions],
+            sending_log=sending_log,
+            connections=Mock(**{"open.return_value": [None]}),
+        )
+        assert sent == [subscriptions[0], subscriptions[2]]
+        assert subscriptions[1] not in sending_log
+        sendings = models.Sending.objects.filter(submission=submission)
+        assert {s.subscription_id for s in sendings} == {
+            subscriptions[0].pk,
+            subscriptions[2].pk,
+        }
+        (failure,) = models.SendingFailure.objects.filter(submission=submission)
+        assert failure.subscription == subscriptions[1]
+        assert failure.last_error == "ValueError('boom')"
+        sendings.delete()
+        failure.delete()
+
+    @patch.object(services.hookset, "send_messages")
+    def test_send_batch_connection_failure(
+        self, p_send_messages, subscription_factory, submission
+    ):
+        subscriptions = [subscription_factory() for _ in range(2)]
+        connections = Mock()
+        connections.open.side_effect = ConnectionRefusedError("down")
+        sent = services.SubmissionService()._send_batch(
+            [(s, {}) for s in subscriptions],
+            sending_log=services.SendingLog(submission),
+            connections=connections,
+        )
+        assert sent == []
+        p_send_messages.assert_not_called()
+        failures = models.SendingFailure.objects.filter(submission=submission)
+        assert [f.subscription for f in failures] == subscriptions
+        assert all(f.last_error == "ConnectionRefusedError('down')" for f in failures)
+        failures.delete()
+
+    def test_send_batch_empty(self, submission):
+        connections = Mock()
+        sent = services.SubmissionService()._send_batch(
+            [], sending_log=services.SendingLog(submission), connections=connections
+        )
+        assert sent == []
+        connections.open.assert_not_called()
+
+    def test_advance_cursor(self, subscription_factory, submission):
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(4)
+        ]
+        for subscription in subscriptions[:2]:
+            models.Sending.objects.create(
+                submission=submission, subscription=subscription
             )
-        assert not models.Sending.objects.filter(
-            submission=submission, subscription=active_subscription
-        ).exists()
+        models.SendingFailure.objects.create(
+            submission=submission, subscription=subscriptions[2]
+        )
+        service = services.SubmissionService()
+        service._advance_cursor(submission, after=subscriptions[2].pk)
+        assert submission.cursor == subscriptions[3].pk - 1
+        submission.refresh_from_db()
+        assert submission.cursor == subscriptions[3].pk - 1
+        models.Sending.objects.create(
+            submission=submission, subscription=subscriptions[3]
+        )
+        service._advance_cursor(submission, after=subscriptions[3].pk)
+        assert submission.cursor == subscriptions[3].pk
+        models.Sending.objects.filter(submission=submission).delete()
+        models.SendingFailure.objects.filter(submission=submission).delete()
+
+    def test_advance_cursor_moved_elsewhere(self, subscription_factory, submission):
+        subscription = subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+        models.Submission.objects.filter(pk=submission.pk).update(
+            cursor=subscription.pk + 10
+        )
+        services.SubmissionService()._advance_cursor(submission, after=subscription.pk)
+        submission.refresh_from_db()
+        assert submission.cursor == subscription.pk + 10
+
+    @override_settings(MAILINGLIST_MAX_ATTEMPTS=3, MAILINGLIST_RETRY_DELAY=10)
+    def test_record_failures(self, subscription_factory, submission):
+        subscription = subscription_factory()
+        service = services.SubmissionService()
+        start = now()
+        service._record_failures(submission, [(subscription, ValueError("one"))])
+        failure = models.SendingFailure.objects.get(
+            submission=submission, subscription=subscription
+        )
+        assert failure.status == SendingFailureStatusEnum.RETRYING
+        assert failure.attempts == 1
+        assert failure.next_attempt >= start + timedelta(seconds=10)
+        service._record_failures(submission, [(subscription, ValueError("two"))])
+        failure.refresh_from_db()
+        assert failure.attempts == 2
+        assert failure.next_attempt >= start + timedelta(seconds=20)
+        assert failure.last_error == "ValueError('two')"
+        service._record_failures(submission, [(subscription, ValueError("three"))])
+        failure.refresh_from_db()
+        assert failure.status == SendingFailureStatusEnum.DEAD
+        assert failure.next_attempt is None
+        failure.delete()
+
+    def test_claim_subscribers_failures(self, subscription_factory, submission):
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(4)
+        ]
+        for subscription, status, next_attempt in (
+            (subscriptions[1], SendingFailureStatusEnum.RETRYING, now()),
+            (
+                subscriptions[2],
+                SendingFailureStatusEnum.RETRYING,
+                now() + timedelta(minutes=1),
+            ),
+            (subscriptions[3], SendingFailureStatusEnum.DEAD, None),
+        ):
+            models.SendingFailure.objects.create(
+                submission=submission,
+                subscription=subscription,
+                status=status,
+                next_attempt=next_attempt,
+            )
+        service = services.SubmissionService()
+        with transaction.atomic():
+            assert service._claim_subscribers(submission)[0] == subscriptions[:1]
+            assert service._claim_subscribers(submission, retry=True)[0] == [
+                subscriptions[1]
+            ]
+        models.SendingFailure.objects.filter(submission=submission).delete()
 
     def test_get_outstanding_submissions_sending(self, submission):
         submission.status = SubmissionStatusEnum.PENDING
@@ -390,97 +1110,382 @@ class TestSubmissionService:
         outstanding = services.SubmissionService()._get_outstanding_submissions()
         assert submission not in outstanding
 
-    @patch.object(services.SubmissionService, "_rate_limit")
-    @patch.object(services.SubmissionService, "_ensure_sent")
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch.object(services.hookset, "send_messages")
     def test_process_submission_attachments(
         self,
-        p_ensure_sent,
-        p_rate_limit,
+        p_send_messages,
+        p_batch_delay,
         submission,
         active_subscription,
         message_attachment,
     ):
         submission.status = SubmissionStatusEnum.PENDING
         submission.save()
-        p_ensure_sent.return_value = True
+        p_send_messages.return_value = [None]
         _send_count = services.SubmissionService().process_submission(submission)
-        p_ensure_sent.assert_called_once()
-        assert p_ensure_sent.call_args.kwargs["attachments"] == [message_attachment]
-        p_rate_limit.assert_called_once_with(1)
+        p_send_messages.assert_called_once()
+        messages = p_send_messages.call_args.args[0]
+        (attachment,) = messages[0]["attachments"]
+        assert attachment.attachment == message_attachment
+        assert attachment.content == message_attachment.file.read()
+        p_batch_delay.assert_called_once_with(0, 1)
         submission.refresh_from_db()
         assert submission.status == SubmissionStatusEnum.SENT
         assert _send_count == 1
+        models.Sending.objects.filter(submission=submission).delete()
 
-    @patch.object(services.SubmissionService, "_rate_limit")
-    @patch.object(services.SubmissionService, "_ensure_sent")
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch.object(services.SubmissionService, "_prepare_message")
+    @patch.object(services.hookset, "send_messages")
     def test_process_submission_template_set(
         self,
-        p_ensure_sent,
-        p_rate_limit,
+        p_send_messages,
+        p_prepare_message,
+        p_batch_delay,
         submission,
         active_subscription,
-        message_attachment,
     ):
         submission.status = SubmissionStatusEnum.PENDING
         submission.save()
-        p_ensure_sent.return_value = True
+        p_send_messages.return_value = [None]
         _send_count = services.SubmissionService().process_submission(submission)
-        p_ensure_sent.assert_called_once()
+        p_prepare_message.assert_called_once()
         assert (
-            p_ensure_sent.call_args.kwargs["template_set"].mailing_list
+            p_prepare_message.call_args.kwargs["template_set"].mailing_list
             == submission.message.mailing_list
         )
-        p_rate_limit.assert_called_once_with(1)
+        p_batch_delay.assert_called_once_with(0, 1)
         submission.refresh_from_db()
         assert submission.status == SubmissionStatusEnum.SENT
         assert _send_count == 1
+        models.Sending.objects.filter(submission=submission).delete()
 
-    @patch.object(services.SubmissionService, "_rate_limit")
-    @patch.object(services.SubmissionService, "_ensure_sent")
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch.object(services.hookset, "send_messages")
     def test_process_submission(
-        self, p_ensure_sent, p_rate_limit, submission, active_subscription
+        self, p_send_messages, p_batch_delay, submission, active_subscription
     ):
         submission.status = SubmissionStatusEnum.PENDING
         submission.save()
-        p_ensure_sent.return_value = True
+        p_send_messages.return_value = [None]
         _send_count = services.SubmissionService().process_submission(submission)
-        p_ensure_sent.assert_called_once()
-        p_rate_limit.assert_called_once_with(1)
+        p_send_messages.assert_called_once()
+        messages = p_send_messages.call_args.args[0]
+        assert messages[0]["to"] == [active_subscription.user.email]
+        assert messages[0]["from_email"] == submission.message.mailing_list.sender_tag
+        p_batch_delay.assert_called_once_with(0, 1)
         submission.refresh_from_db()
         assert submission.status == SubmissionStatusEnum.SENT
         assert _send_count == 1
+        assert models.Sending.objects.filter(
+            submission=submission, subscription=active_subscription
+        ).exists()
+        models.Sending.objects.filter(submission=submission).delete()
 
-    @patch.object(services.SubmissionService, "_rate_limit")
-    @patch.object(services.SubmissionService, "_ensure_sent")
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch.object(services.hookset, "send_messages")
     def test_process_submission_send_count(
-        self, p_ensure_sent, p_rate_limit, submission, active_subscription
+        self, p_send_messages, p_batch_delay, submission, active_subscription
     ):
         submission.status = SubmissionStatusEnum.PENDING
         submission.save()
-        p_ensure_sent.return_value = True
+        p_send_messages.return_value = [None]
         _send_count = services.SubmissionService().process_submission(
             submission, send_count=2
         )
-        p_ensure_sent.assert_called_once()
-        p_rate_limit.assert_called_once_with(3)
+        p_send_messages.assert_called_once()
+        p_batch_delay.assert_called_once_with(2, 3)
         submission.refresh_from_db()
         assert submission.status == SubmissionStatusEnum.SENT
         assert _send_count == 3
+        models.Sending.objects.filter(submission=submission).delete()
 
-    @patch.object(services.SubmissionService, "_rate_limit")
-    @patch.object(services.SubmissionService, "_ensure_sent")
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch.object(services.hookset, "send_messages")
     def test_process_submission_not_send(
-        self, p_ensure_sent, p_rate_limit, submission, active_subscription
+        self, p_send_messages, p_batch_delay, submission, active_subscription
+    ):
+        models.Sending.objects.create(
+            submission=submission, subscription=active_subscription
+        )
+        submission.status = SubmissionStatusEnum.PENDING
+        submission.save()
+        _send_count = services.SubmissionService().process_submission(submission)
+        p_send_messages.assert_not_called()
+        p_batch_delay.assert_not_called()
+        submission.refresh_from_db()
+        assert submission.status == SubmissionStatusEnum.SENT
+        assert _send_count == 0
+        models.Sending.objects.filter(submission=submission).delete()
+
+    @override_settings(MAILINGLIST_BATCH_SIZE=2)
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch.object(services.hookset, "send_messages")
+    def test_process_submission_batches(
+        self, p_send_messages, p_batch_delay, submission, subscription_factory
+    ):
+        for _ in range(5):
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+        p_send_messages.side_effect = lambda messages, **kwargs: [None] * len(messages)
+        submission.status = SubmissionStatusEnum.PENDING
+        submission.save()
+        _send_count = services.SubmissionService().process_submission(submission)
+        assert [len(c.args[0]) for c in p_send_messages.call_args_list] == [2, 2, 1]
+        assert _send_count == 5
+        assert p_batch_delay.call_count == 3
+        models.Sending.objects.filter(submission=submission).delete()
+
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch("mailinglist.hooks.MailinglistDefaultHookset.send_message")
+    def test_process_submission_records_sent_on_failure(
+        self, p_send_message, p_batch_delay, submission, subscription_factory
+    ):
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(3)
+        ]
+        p_send_message.side_effect = [None, SMTPException("boom"), None]
+        submission.status = SubmissionStatusEnum.PENDING
+        submission.save()
+        assert services.SubmissionService().process_submission(submission) == 2
+        sent = models.Sending.objects.filter(submission=submission)
+        assert sent.count() == 2
+        failures = models.SendingFailure.objects.filter(submission=submission)
+        assert [f.subscription for f in failures] == [subscriptions[1]]
+        submission.refresh_from_db()
+        assert submission.status == SubmissionStatusEnum.SENDING
+        # not retried before the delay has passed
+        p_send_message.side_effect = None
+        p_send_message.reset_mock()
+        services.SubmissionService().process_submission(submission)
+        p_send_message.assert_not_called()
+        failures.update(next_attempt=now())
+        services.SubmissionService().process_submission(submission)
+        assert sent.count() == 3
+        p_send_message.assert_called_once()
+        assert p_send_message.call_args.kwargs["to"] == [subscriptions[1].user.email]
+        assert {s.subscription_id for s in sent} == {s.pk for s in subscriptions}
+        assert not failures.exists()
+        submission.refresh_from_db()
+        assert submission.status == SubmissionStatusEnum.SENT
+        sent.delete()
+
+    @override_settings(MAILINGLIST_MAX_ATTEMPTS=1)
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch("mailinglist.hooks.MailinglistDefaultHookset.send_message")
+    def test_process_submission_gives_up(
+        self, p_send_message, p_batch_delay, submission, subscription_factory
+    ):
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(2)
+        ]
+        p_send_message.side_effect = [SMTPException("boom"), None]
+        submission.status = SubmissionStatusEnum.PENDING
+        submission.save()
+        assert services.SubmissionService().process_submission(submission) == 1
+        (failure,) = models.SendingFailure.objects.filter(submission=submission)
+        assert failure.subscription == subscriptions[0]
+        assert failure.status == SendingFailureStatusEnum.DEAD
+        submission.refresh_from_db()
+        assert submission.status == SubmissionStatusEnum.SENT
+        failure.delete()
+        models.Sending.objects.filter(submission=submission).delete()
+
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch("mailinglist.hooks.MailinglistDefaultHookset.send_message")
+    def test_process_submission_shares_connection(
+        self, p_send_message, p_batch_delay, submission, subscription_factory
+    ):
+        for _ in range(3):
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+        submission.status = SubmissionStatusEnum.PENDING
+        submission.save()
+        services.SubmissionService().process_submission(submission)
+        assert p_send_message.call_count == 3
+        connections = {c.kwargs["connection"] for c in p_send_message.call_args_list}
+        assert len(connections) == 1
+        assert None not in connections
+        models.Sending.objects.filter(submission=submission).delete()
+
+    @override_settings(MAILINGLIST_SEND_WORKERS=3)
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch("mailinglist.hooks.MailinglistDefaultHookset.send_message")
+    def test_process_submission_workers(
+        self, p_send_message, p_batch_delay, submission, subscription_factory
     ):
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(7)
+        ]
         submission.status = SubmissionStatusEnum.PENDING
         submission.save()
-        p_ensure_sent.return_value = False
         _send_count = services.SubmissionService().process_submission(submission)
-        p_ensure_sent.assert_called_once()
-        p_rate_limit.assert_not_called()
+        assert _send_count == 7
+        assert p_batch_delay.call_count == 1
+        connections = {c.kwargs["connection"] for c in p_send_message.call_args_list}
+        assert len(connections) == 3
+        recipients = sorted(c.kwargs["to"][0] for c in p_send_message.call_args_list)
+        assert recipients == sorted(s.user.email for s in subscriptions)
+        sent = models.Sending.objects.filter(submission=submission)
+        assert {s.subscription_id for s in sent} == {s.pk for s in subscriptions}
+        sent.delete()
+
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch.object(services.hookset, "send_messages")
+    def test_process_submission_sent_elsewhere(
+        self, p_send_messages, p_batch_delay, submission, subscription_factory
+    ):
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(2)
+        ]
+        service = services.SubmissionService()
+        claim_subscribers = service._claim_subscribers
+
+        def _claim_subscribers(submission, **kwargs):
+            claimed, last_pk = claim_subscribers(submission, **kwargs)
+            if claimed:
+                # another process sends before the lock is taken
+                models.Sending.objects.get_or_create(
+                    submission=submission, subscription=subscriptions[0]
+                )
+            return claimed, last_pk
+
+        p_send_messages.side_effect = lambda messages, **kwargs: [None] * len(messages)
+        submission.status = SubmissionStatusEnum.PENDING
+        submission.save()
+        with patch.object(service, "_claim_subscribers", _claim_subscribers):
+            _send_count = service.process_submission(submission)
+        assert _send_count == 1
+        messages = p_send_messages.call_args.args[0]
+        assert [m["to"] for m in messages] == [[subscriptions[1].user.email]]
         submission.refresh_from_db()
         assert submission.status == SubmissionStatusEnum.SENT
+        models.Sending.objects.filter(submission=submission).delete()
+
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch.object(services.SubmissionService, "_claim_subscribers")
+    def test_process_submission_claimed_elsewhere(
+        self, p_claim_subscribers, p_batch_delay, submission, active_subscription
+    ):
+        # remaining subscribers are locked by another process
+        p_claim_subscribers.return_value = [], None
+        submission.status = SubmissionStatusEnum.PENDING
+        submission.save()
+        _send_count = services.SubmissionService().process_submission(submission)
         assert _send_count == 0
+        submission.refresh_from_db()
+        assert submission.status == SubmissionStatusEnum.SENDING
+
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch.object(services.hookset, "send_messages")
+    def test_process_submission_query_count(
+        self, p_send_messages, p_batch_delay, submission, subscription_factory
+    ):
+        p_send_messages.side_effect = lambda messages, **kwargs: [None] * len(messages)
+        query_counts = []
+        for count in (1, 5):
+            for _ in range(count - len(query_counts)):
+                subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            models.Sending.objects.filter(submission=submission).delete()
+            models.Submission.objects.filter(pk=submission.pk).update(
+                status=SubmissionStatusEnum.PENDING, cursor=0, snapshot_taken=None
+            )
+            submission = models.Submission.objects.get(pk=submission.pk)
+            with CaptureQueriesContext(connection) as queries:
+                send_count = services.SubmissionService().process_submission(submission)
+            assert send_count == count
+            query_counts.append(len(queries))
+        assert query_counts[0] == query_counts[1]
+        models.Sending.objects.filter(submission=submission).delete()
+
+    @override_settings(MAILINGLIST_QUEUE_SUBMISSIONS=True)
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch("mailinglist.hooks.MailinglistDefaultHookset.connection")
+    @patch("mailinglist.hooks.MailinglistDefaultHookset.send_message")
+    def test_process_submission_queue(
+        self,
+        p_send_message,
+        p_connection,
+        p_batch_delay,
+        submission,
+        subscription_factory,
+        message_attachment,
+    ):
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(2)
+        ]
+        submission.status = SubmissionStatusEnum.PENDING
+        submission.save()
+        _send_count = services.SubmissionService().process_submission(submission)
+        assert _send_count == 2
+        p_send_message.assert_not_called()
+        p_connection.assert_not_called()
+        p_batch_delay.assert_not_called()
+        submission.refresh_from_db()
+        assert submission.status == SubmissionStatusEnum.SENT
+        queued = models.OutboxMessage.objects.filter(submission=submission)
+        assert sorted(q.payload["to"][0] for q in queued) == sorted(
+            s.user.email for s in subscriptions
+        )
+        assert all("attachments" not in q.payload for q in queued)
+        sent = models.Sending.objects.filter(submission=submission)
+        assert {s.subscription_id for s in sent} == {s.pk for s in subscriptions}
+        queued.delete()
+        sent.delete()
+
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch.object(services.hookset, "send_messages")
+    def test_process_submission_resumes_from_cursor(
+        self, p_send_messages, p_batch_delay, submission, subscription_factory
+    ):
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(3)
+        ]
+        # interrupted after sending to the first subscriber
+        models.Sending.objects.create(
+            submission=submission, subscription=subscriptions[0]
+        )
+        models.Submission.objects.filter(pk=submission.pk).update(
+            status=SubmissionStatusEnum.SENDING, cursor=subscriptions[0].pk
+        )
+        submission = models.Submission.objects.get(pk=submission.pk)
+        p_send_messages.side_effect = lambda messages, **kwargs: [None] * len(messages)
+        service = services.SubmissionService()
+        with patch.object(
+            service, "_claim_subscribers", wraps=service._claim_subscribers
+        ) as p_claim_subscribers:
+            assert service.process_submission(submission) == 2
+        assert p_claim_subscribers.call_args_list[0].kwargs["after"] == (
+            subscriptions[0].pk
+        )
+        submission.refresh_from_db()
+        assert submission.cursor == subscriptions[2].pk
+        assert submission.status == SubmissionStatusEnum.SENT
+        models.Sending.objects.filter(submission=submission).delete()
+
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch("mailinglist.hooks.MailinglistDefaultHookset.send_message")
+    def test_process_submission_retrying_behind_cursor(
+        self, p_send_message, p_batch_delay, submission, subscription_factory
+    ):
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(2)
+        ]
+        p_send_message.side_effect = [SMTPException("boom"), None]
+        submission.status = SubmissionStatusEnum.PENDING
+        submission.save()
+        services.SubmissionService().process_submission(submission)
+        submission.refresh_from_db()
+        assert submission.cursor == subscriptions[1].pk
+        assert submission.status == SubmissionStatusEnum.SENDING
+        models.Sending.objects.filter(submission=submission).delete()
+        models.SendingFailure.objects.filter(submission=submission).delete()
 
     @patch.object(services.SubmissionService, "_get_included_subscribers")
     def test_process_submission_interrupt(self, p_get_included_subscribers, submission):
@@ -492,6 +1497,104 @@ class TestSubmissionService:
         submission.refresh_from_db()
         assert submission.status == SubmissionStatusEnum.SENDING
 
+    @override_settings(MAILINGLIST_BATCH_SIZE=1)
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch.object(services.hookset, "send_messages")
+    def test_process_submission_dies_mid_batch(
+        self, p_send_messages, p_batch_delay, submission, subscription_factory
+    ):
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(2)
+        ]
+        # the process dies while the second batch is being sent
+        p_send_messages.side_effect = [[None], KeyboardInterrupt]
+        submission.status = SubmissionStatusEnum.PENDING
+        submission.save()
+        service = services.SubmissionService()
+        with pytest.raises(KeyboardInterrupt):
+            service.process_submission(submission)
+        sent = models.Sending.objects.filter(submission=submission)
+        assert [s.subscription_id for s in sent] == [subscriptions[0].pk]
+        # the claimed batch is not sent again until the claim expires
+        p_send_messages.reset_mock(side_effect=True)
+        p_send_messages.side_effect = lambda messages, **kwargs: [None] * len(messages)
+        assert service.process_submission(submission) == 0
+        p_send_messages.assert_not_called()
+        assert submission.status == SubmissionStatusEnum.SENDING
+        models.Recipient.objects.filter(submission=submission).update(
+            claimed_until=now() - timedelta(seconds=1)
+        )
+        assert service.process_submission(submission) == 1
+        messages = p_send_messages.call_args.args[0]
+        assert [m["to"] for m in messages] == [[subscriptions[1].user.email]]
+        assert submission.status == SubmissionStatusEnum.SENT
+        sent.delete()
+
+    @override_settings(
+        MAILINGLIST_SHARED_RATE_LIMIT=True,
+        MAILINGLIST_SEND_RATE=1000,
+        MAILINGLIST_SEND_BURST=10,
+    )
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch.object(services.hookset, "send_messages")
+    def test_process_submission_sends_outside_transaction(
+        self, p_send_messages, p_batch_delay, submission, subscription_factory
+    ):
+        subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+        # the test itself runs in a transaction
+        depth = len(connection.atomic_blocks)
+        depths = []
+
+        def send_messages(messages, **kwargs):
+            # the rate limit bucket (and the claim) are committed by now
+            assert models.RateLimitBucket.objects.filter(name="default").exists()
+            depths.append(len(connection.atomic_blocks))
+            return [None] * len(messages)
+
+        p_send_messages.side_effect = send_messages
+        submission.status = SubmissionStatusEnum.PENDING
+        submission.save()
+        assert services.SubmissionService().process_submission(submission) == 1
+        assert depths == [depth]
+        models.Sending.objects.filter(submission=submission).delete()
+
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch("mailinglist.hooks.MailinglistDefaultHookset.connection")
+    def test_process_submission_connection_failure(
+        self, p_connection, p_batch_delay, submission, subscription_factory
+    ):
+        subscription = subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+        p_connection.side_effect = ConnectionRefusedError("down")
+        submission.status = SubmissionStatusEnum.PENDING
+        submission.save()
+        assert services.SubmissionService().process_submission(submission) == 0
+        (failure,) = models.SendingFailure.objects.filter(submission=submission)
+        assert failure.subscription == subscription
+        assert failure.last_error == "ConnectionRefusedError('down')"
+        submission.refresh_from_db()
+        assert submission.status == SubmissionStatusEnum.SENDING
+        # nothing due, no connection is opened
+        p_connection.reset_mock()
+        services.SubmissionService().process_submission(submission)
+        p_connection.assert_not_called()
+        failure.delete()
+
+    @patch("mailinglist.hooks.MailinglistDefaultHookset.connection")
+    def test_backend_connections(self, p_connection):
+        opened = MagicMock()
+        p_connection.side_effect = [ConnectionRefusedError("down"), opened]
+        with services.BackendConnections() as connections:
+            p_connection.assert_not_called()
+            with pytest.raises(ConnectionRefusedError):
+                connections.open()
+            # opened again after the failure, then reused
+            assert connections.open() == [opened.__enter__.return_value]
+            assert connections.open() == [opened.__enter__.return_value]
+            opened.__exit__.assert_not_called()
+        assert p_connection.call_count == 2
+        opened.__exit__.assert_called_once()
+
     @patch.object(services.SubmissionService, "process_submission")
     @patch.object(services.SubmissionService, "_get_outstanding_submissions")
     def test_process_submissions(
@@ -512,6 +1615,59 @@ class TestSubmissionService:
         assert submission.published is not None
         assert submission.status == SubmissionStatusEnum.PENDING
 
+    @patch.object(services.SubmissionService, "snapshot_chunk_size", 2)
+    def test_publish_snapshot(self, submission, subscription_factory):
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(5)
+        ]
+        subscription_factory(status=SubscriptionStatusEnum.UNSUBSCRIBED)
+        submission.exclude.add(subscriptions[0])
+        services.SubmissionService().publish(submission)
+        submission.refresh_from_db()
+        assert submission.snapshot_taken is not None
+        recipients = submission.recipients.order_by("subscription")
+        assert [r.subscription for r in recipients] == subscriptions[1:]
+
+    def test_publish_snapshot_replaced(self, submission, subscription_factory):
+        service = services.SubmissionService()
+        service.publish(submission)
+        assert not submission.recipients.exists()
+        subscription = subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+        service.publish(submission)
+        assert [r.subscription for r in submission.recipients.all()] == [subscription]
+
+    def test_get_included_subscribers_snapshot(self, submission, subscription_factory):
+        service = services.SubmissionService()
+        recorded = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(2)
+        ]
+        service.publish(submission)
+        # joined after publishing
+        subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+        # left after publishing
+        models.Subscription.objects.filter(pk=recorded[0].pk).update(
+            status=SubscriptionStatusEnum.UNSUBSCRIBED
+        )
+        assert list(service._get_included_subscribers(submission)) == recorded[1:]
+
+    @patch.object(services.hookset, "send_messages")
+    def test_process_submission_snapshot(
+        self, p_send_messages, submission, subscription_factory
+    ):
+        p_send_messages.side_effect = lambda messages, **kwargs: [None] * len(messages)
+        subscription = subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+        submission.status = SubmissionStatusEnum.PENDING
+        submission.save()
+        assert submission.snapshot_taken is None
+        services.SubmissionService().process_submission(submission)
+        submission.refresh_from_db()
+        assert submission.snapshot_taken is not None
+        assert [r.subscription for r in submission.recipients.all()] == [subscription]
+        assert submission.status == SubmissionStatusEnum.SENT
+        models.Sending.objects.filter(submission=submission).delete()
+
     def test_submit_message(self, message):
         assert not hasattr(message, "submission")
         services.SubmissionService().submit_message(message)
@@ -530,37 +1686,192 @@ class TestSubmissionService:
         assert models.Submission.objects.filter(message=message).count() == 1
 
     @patch.object(services.MessageService, "prepare_message_kwargs")
-    @patch.object(services.hookset, "send_message")
-    def test_send_message(
-        self, p_send_message, p_prepare_message_kwargs, message, subscription
-    ):
+    def test_prepare_message(self, p_prepare_message_kwargs, message, subscription):
         p_prepare_message_kwargs.return_value = {"stuff": "yeah"}
-        services.SubmissionService()._send_message(
+        ret = services.SubmissionService()._prepare_message(
             message=message, subscription=subscription, template_set=None
         )
         p_prepare_message_kwargs.assert_called_once_with(
             message=message, subscription=subscription, template_set=None
         )
-        p_send_message.assert_called_once_with(
-            from_email=subscription.mailing_list.sender_tag,
-            stuff="yeah",
-        )
+        assert ret == {
+            "from_email": subscription.mailing_list.sender_tag,
+            "stuff": "yeah",
+        }
 
     @patch.object(services.MessageService, "prepare_message_kwargs")
-    @patch.object(services.hookset, "send_message")
-    def test_send_message_extra_kwargs(
-        self, p_send_message, p_prepare_message_kwargs, message, subscription
+    def test_prepare_message_extra_kwargs(
+        self, p_prepare_message_kwargs, message, subscription
     ):
         p_prepare_message_kwargs.return_value = {"stuff": "yeah"}
-        services.SubmissionService()._send_message(
+        ret = services.SubmissionService()._prepare_message(
             message=message, subscription=subscription, template_set=None, more=True
         )
         p_prepare_message_kwargs.assert_called_once_with(
             message=message, subscription=subscription, template_set=None
         )
-        p_send_message.assert_called_once_with(
-            from_email=subscription.mailing_list.sender_tag, stuff="yeah", more=True
+        assert ret == {
+            "from_email": subscription.mailing_list.sender_tag,
+            "stuff": "yeah",
+            "more": True,
+        }
+
+
+class TestOutboxService:
+    def test_enqueue(self, db):
+        outbox_message = services.OutboxService().enqueue(to=["a@b.c"], body="hi")
+        outbox_message.refresh_from_db()
+        assert outbox_message.payload == {"to": ["a@b.c"], "body": "hi"}
+
+    @override_settings(MAILINGLIST_BATCH_SIZE=2)
+    @patch.object(services.hookset, "send_messages")
+    def test_process_outbox(self, p_send_messages, db):
+        for i in range(3):
+            services.OutboxService().enqueue(to=[f"{i}@b.c"])
+        p_send_messages.side_effect = lambda messages, **kwargs: [None] * len(messages)
+        assert services.OutboxService().process_outbox() == 3
+        assert [
+            [m["to"] for m in c.args[0]] for c in p_send_messages.call_args_list
+        ] == [[["0@b.c"], ["1@b.c"]], [["2@b.c"]]]
+        connections = {c.kwargs["connection"] for c in p_send_messages.call_args_list}
+        assert len(connections) == 1
+        assert not models.OutboxMessage.objects.exists()
+
+    @override_settings(MAILINGLIST_CLAIM_TIMEOUT=600)
+    def test_claim_messages(self, db):
+        queued = [services.OutboxService().enqueue(to=[f"{i}@b.c"]) for i in range(2)]
+        start = now()
+        assert services.OutboxService()._claim_messages() == queued
+        assert all(
+            q.next_attempt >= start + timedelta(seconds=600)
+            for q in models.OutboxMessage.objects.all()
+        )
+        # passed over by other processes until the claim expires
+        assert services.OutboxService()._claim_messages() == []
+
+    @override_settings(MAILINGLIST_SHARED_RATE_LIMIT=True, MAILINGLIST_SEND_RATE=1000)
+    @patch.object(services.hookset, "send_messages")
+    def test_process_outbox_sends_outside_transaction(self, p_send_messages, db):
+        services.OutboxService().enqueue(to=["a@b.c"])
+        # the test itself runs in a transaction
+        depth = len(connection.atomic_blocks)
+        depths = []
+
+        def send_messages(messages, **kwargs):
+            depths.append(len(connection.atomic_blocks))
+            return [None] * len(messages)
+
+        p_send_messages.side_effect = send_messages
+        assert services.OutboxService().process_outbox() == 1
+        assert depths == [depth]
+
+    @patch("mailinglist.hooks.MailinglistDefaultHookset.connection")
+    def test_process_outbox_empty(self, p_connection, db):
+        assert services.OutboxService().process_outbox() == 0
+        p_connection.assert_not_called()
+
+    @override_settings(MAILINGLIST_RETRY_DELAY=60)
+    @patch.object(services.hookset, "send_messages")
+    @patch("mailinglist.hooks.MailinglistDefaultHookset.connection")
+    def test_process_outbox_connection_failure(
+        self, p_connection, p_send_messages, db
+    ):
+        outbox_message = services.OutboxService().enqueue(to=["a@b.c"])
+        p_connection.side_effect = ConnectionRefusedError("down")
+        start = now()
+        assert services.OutboxService().process_outbox() == 0
+        p_send_messages.assert_not_called()
+        outbox_message.refresh_from_db()
+        assert outbox_message.attempts == 1
+        assert outbox_message.last_error == "ConnectionRefusedError('down')"
+        assert outbox_message.next_attempt >= start + timedelta(seconds=60)
+
+    @override_settings(MAILINGLIST_SEND_RATE=1000, MAILINGLIST_SEND_BURST=2)
+    @patch.object(services.hookset, "send_messages")
+    def test_process_outbox_bursts(self, p_send_messages, db):
+        for i in range(3):
+            services.OutboxService().enqueue(to=[f"{i}@b.c"])
+        p_send_messages.side_effect = lambda messages, **kwargs: [None] * len(messages)
+        assert services.OutboxService().process_outbox() == 3
+        assert [len(c.args[0]) for c in p_send_messages.call_args_list] == [2, 1]
+
+    @override_settings(MAILINGLIST_RETRY_DELAY=60)
+    @patch.object(services.hookset, "send_messages")
+    def test_process_outbox_failure(self, p_send_messages, db):
+        queued = [services.OutboxService().enqueue(to=[f"{i}@b.c"]) for i in range(3)]
+        p_send_messages.return_value = [None, ValueError("boom"), None]
+        start = now()
+        assert services.OutboxService().process_outbox() == 2
+        (failed,) = models.OutboxMessage.objects.all()
+        assert failed == queued[1]
+        assert failed.attempts == 1
+        assert failed.last_error == "ValueError('boom')"
+        assert failed.next_attempt >= start + timedelta(seconds=60)
+        # not retried until the delay has passed
+        p_send_messages.reset_mock()
+        assert services.OutboxService().process_outbox() == 0
+        p_send_messages.assert_not_called()
+
+    @override_settings(MAILINGLIST_MAX_ATTEMPTS=2, MAILINGLIST_RETRY_DELAY=60)
+    @patch.object(services.hookset, "send_messages")
+    def test_process_outbox_gives_up(self, p_send_messages, db):
+        outbox_message = services.OutboxService().enqueue(to=["a@b.c"])
+        p_send_messages.return_value = [ValueError("boom")]
+        services.OutboxService().process_outbox()
+        outbox_message.refresh_from_db()
+        assert outbox_message.next_attempt is not None
+        models.OutboxMessage.objects.update(next_attempt=now())
+        services.OutboxService().process_outbox()
+        outbox_message.refresh_from_db()
+        assert outbox_message.attempts == 2
+        assert outbox_message.next_attempt is None
+
+    @override_settings(MAILINGLIST_MAX_ATTEMPTS=1, MAILINGLIST_QUEUE_SUBMISSIONS=True)
+    @patch.object(services.SubmissionService, "_batch_delay")
+    @patch.object(services.hookset, "send_messages")
+    def test_process_outbox_gives_up_submission(
+        self, p_send_messages, p_batch_delay, submission, subscription_factory
+    ):
+        subscriptions = [
+            subscription_factory(status=SubscriptionStatusEnum.SUBSCRIBED)
+            for _ in range(2)
+        ]
+        submission.status = SubmissionStatusEnum.PENDING
+        submission.save()
+        services.SubmissionService().process_submission(submission)
+        p_send_messages.return_value = [None, ValueError("boom")]
+        assert services.OutboxService().process_outbox() == 1
+        sent = models.Sending.objects.filter(submission=submission)
+        assert [s.subscription for s in sent] == subscriptions[:1]
+        (failure,) = models.SendingFailure.objects.filter(submission=submission)
+        assert failure.subscription == subscriptions[1]
+        assert failure.status == SendingFailureStatusEnum.DEAD
+        assert failure.attempts == 1
+        assert failure.last_error == "ValueError('boom')"
+        submission.refresh_from_db()
+        assert submission.status == SubmissionStatusEnum.SENT
+        models.OutboxMessage.objects.all().delete()
+        sent.delete()
+        failure.delete()
+
+    @patch.object(services.hookset, "send_messages")
+    def test_process_outbox_attachments(
+        self, p_send_messages, submission, message_attachment
+    ):
+        outbox_message = services.OutboxService().enqueue(
+            submission=submission, to=["a@b.c"]
         )
+        p_send_messages.return_value = [None]
+        services.OutboxService().process_outbox()
+        (payload,) = p_send_messages.call_args.args[0]
+        assert payload["to"] == ["a@b.c"]
+        assert [a.attachment for a in payload["attachments"]] == [message_attachment]
+        assert not models.OutboxMessage.objects.filter(pk=outbox_message.pk).exists()
+
+    @override_settings(MAILINGLIST_RETRY_DELAY=10)
+    def test_get_retry_delay(self):
+        assert services.get_retry_delay(1) == timedelta(seconds=10)
+        assert services.get_retry_delay(3) == timedelta(seconds=40)
 
 
 class TestSubscriptionService:
@@ -710,6 +2021,91 @@ class TestSubscriptionService:
         services.SubscriptionService().confirm_subscription(token=subscription.token)
         assert models.GlobalDeny.objects.filter(user=user).exists()
 
+    @override_settings(MAILINGLIST_QUEUE_CONFIRMATIONS=True)
+    @patch.object(services.hookset, "send_message")
+    def test_subscribe_queue_confirmation(self, p_send, user, mailing_list):
+        subscription = services.SubscriptionService().subscribe(
+            user=user, mailing_list=mailing_list
+        )
+        p_send.assert_not_called()
+        (queued,) = models.OutboxMessage.objects.all()
+        assert queued.payload["to"] == [user.email]
+        assert queued.payload["from_email"] == mailing_list.sender_tag
+        assert subscription.token in queued.payload["body"]
+
+    def test_bulk_force_subscribe(self, user_factory, mailing_list):
+        new_user, unsubscribed_user, subscribed_user = [
+            user_factory() for _ in range(3)
+        ]
+        unsubscribed = models.Subscription.objects.create(
+            user=unsubscribed_user,
+            mailing_list=mailing_list,
+            token="unsubscribed",
+            status=SubscriptionStatusEnum.UNSUBSCRIBED,
+        )
+        subscribed = models.Subscription.objects.create(
+            user=subscribed_user,
+            mailing_list=mailing_list,
+            token="subscribed",
+            status=SubscriptionStatusEnum.SUBSCRIBED,
+        )
+        subscriptions = services.SubscriptionService().bulk_force_subscribe(
+            users=[new_user, unsubscribed_user, subscribed_user, new_user],
+            mailing_list=mailing_list,
+        )
+        assert [s.user for s in subscriptions] == [
+            new_user,
+            unsubscribed_user,
+            subscribed_user,
+        ]
+        assert subscriptions[1:] == [unsubscribed, subscribed]
+        for subscription in subscriptions:
+            subscription = models.Subscription.objects.get(pk=subscription.pk)
+            assert subscription.status == SubscriptionStatusEnum.SUBSCRIBED
+            assert subscription.mailing_list == mailing_list
+            assert subscription.token
+        changes = models.SubscriptionChange.objects.order_by("pk")
+        assert [(c.subscription, c.from_status, c.to_status) for c in changes] == [
+            (
+                subscriptions[0],
+                SubscriptionStatusEnum.PENDING,
+                SubscriptionStatusEnum.SUBSCRIBED,
+            ),
+            (
+                unsubscribed,
+                SubscriptionStatusEnum.UNSUBSCRIBED,
+                SubscriptionStatusEnum.SUBSCRIBED,
+            ),
+        ]
+
+    def test_bulk_force_subscribe_global(self, user):
+        services.SubscriptionService().bulk_force_subscribe(
+            users=[user], mailing_list=None
+        )
+        assert models.GlobalDeny.objects.filter(user=user).exists()
+
+    @patch.object(services.SubscriptionService, "import_chunk_size", 2)
+    @patch.object(
+        services.hookset,
+        "bulk_create_users",
+        MailinglistDefaultHookset().bulk_create_users,
+    )
+    def test_import_subscribers(self, mailing_list, django_assert_num_queries):
+        addresses = [
+            {"email": f"new{i}@email.com", "first_name": "New", "last_name": "User"}
+            for i in range(4)
+        ]
+        service = services.SubscriptionService()
+        # users, subscriptions, changes and status per chunk of two
+        with django_assert_num_queries(2 * 6 + 2):
+            count = service.import_subscribers(
+                addresses=addresses, mailing_list=mailing_list
+            )
+        assert count == 4
+        subscriptions = mailing_list.subscriptions.order_by("user__email")
+        assert [s.user.email for s in subscriptions] == [a["email"] for a in addresses]
+        assert all(s.status == SubscriptionStatusEnum.SUBSCRIBED for s in subscriptions)
+
     def test_force_subscribe(self, user, mailing_list):
         assert not user.subscriptions.all().exists()
         subscription = services.SubscriptionService().force_subscribe(
@@ -1,7 +1,7 @@
 from unittest.mock import patch, Mock
 from django.contrib.auth.models import AnonymousUser
 from django.urls import reverse
-from django.test import override_settings
+from django.test import Client, override_settings
 
 from mailinglist import enum, models, views
 
@@ -237,6 +237,18 @@ class TestUnsubscribeView:
         active_subscription.refresh_from_db()
         assert active_subscription.status == enum.SubscriptionStatusEnum.UNSUBSCRIBED
 
+    def test_one_click_unsubscribe(self, mailing_list, active_subscription):
+        client = Client(enforce_csrf_checks=True)
+        response = client.post(
+            reverse(
+                "mailinglist:unsubscribe", kwargs={"token": active_subscription.token}
+            ),
+            {"List-Unsubscribe": "One-Click"},
+        )
+        assert response.status_code == 200
+        active_subscription.refresh_from_db()
+        assert active_subscription.status == enum.SubscriptionStatusEnum.UNSUBSCRIBED
+
     def test_bad_unsubscribe(self, client, mailing_list, active_subscription):
         response = client.get(
             reverse(